@@ -0,0 +1,39 @@
+"""
+Compare ElGamal.verify_batch with a loop over ElGamal.verify, for an all valid batch
+and for batches with one and with ten invalid signatures.
+
+usage: python benchmark/bench_elgamal.py [signatures] [key size]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from libsig.RenHarn import ElGamal
+
+
+def main(count=1000, size=1024):
+    pubkey, privkey = ElGamal.keygen(size)
+    messages = [str(i).encode() for i in range(count)]
+    signatures = [ElGamal.sign(privkey, message, randomness_pool=True) for message in messages]
+    print("{:>8} {:>10} {:>12} {:>12} {:>8}".format("batch", "invalid", "loop ms", "batch ms", "speedup"))
+    for bad in (0, 1, 10):
+        batch = list(signatures)
+        for i in range(bad):
+            alpha, beta = batch[i * count // bad]
+            # beta + 2 keeps the quadratic character, so that the error is only found by the multi-exponentiation
+            batch[i * count // bad] = (alpha, beta + 2)
+        start = time.perf_counter()
+        expected = [ElGamal.verify(pubkey, m, s) for m, s in zip(messages, batch)]
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        results = ElGamal.verify_batch(pubkey, messages, batch)
+        batched = time.perf_counter() - start
+        assert results == expected
+        print("{:>8} {:>10} {:>12.2f} {:>12.2f} {:>8.2f}".format(count, bad, 1000 * loop, 1000 * batched,
+                                                                  loop / batched))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,62 @@
+"""
+Compare ways to compute the products z1 = g^s y^c and z2 = h^s y~^c of LWW verification, at ring sizes 8..4096:
+ pow: two pow() per product, like LWW did before
+ straus: libsig.arithmetic.multi_pow per product
+ LWW.verify: fixed-base tables for g, h and y~, like LWW does now
+
+usage: python benchmark/bench_lww.py [largest ring size]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from libsig.LWW_Scheme import LWW, LWWRing
+from libsig.arithmetic import multi_pow
+
+
+def verify_with(product, ring, message, signature):
+    c1, s, y_Tilde = signature
+    q, g, h = ring.q, ring.g, ring.h
+    challenge = ring.chain(y_Tilde, message)
+    c = c1
+    for y, si in zip(ring.publicKeys, s):
+        c = challenge(product(g, si, y, c, q), product(h, si, y_Tilde, c, q))
+    return c == c1
+
+
+def pow_product(a, x, b, y, q):
+    return pow(a, x, q) * pow(b, y, q) % q
+
+
+def straus_product(a, x, b, y, q):
+    return multi_pow([a, b], [x, y], q)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    assert function(*args)
+    return time.perf_counter() - start
+
+
+def main(largest=4096):
+    message = b"benchmark"
+    completeKeys = []
+    print("{:>6} {:>10} {:>10} {:>12}".format("ring", "pow s", "straus s", "LWW.verify s"))
+    for n in (8, 32, 128, 512, 1024, 2048, 4096):
+        if n > largest:
+            break
+        completeKeys += [LWW.keygen() for _ in range(n - len(completeKeys))]
+        publicKeys = [(y, q, g) for y, x, q, g in completeKeys]
+        ring = LWWRing(publicKeys)
+        signature = LWW.ringsign(completeKeys[0][1], ring, message)
+        print("{:>6} {:>10.3f} {:>10.3f} {:>12.3f}".format(
+            n,
+            timed(verify_with, pow_product, ring, message, signature),
+            timed(verify_with, straus_product, ring, message, signature),
+            timed(LWW.verify, LWWRing(publicKeys), message, signature)))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,37 @@
+"""
+Verify latency of LWW for a large ring with 1, 2, 4, ... worker processes, up to one per cpu.
+Only g^s_i and h^s_i are spread over the workers, y_i^c_i and y~^c_i stay on the sequential hash chain,
+so the speedup is bounded by the share of the former.
+
+usage: python benchmark/bench_lww_parallel.py [ring size] [group]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from libsig.LWW_Scheme import LWW, LWWRing
+
+
+def main(size=10000, group="modp1024-q256"):
+    completeKeys = [LWW.keygen(group=group) for _ in range(size)]
+    ring = LWWRing([[key[0]] + key[2:] for key in completeKeys])
+    message = b"benchmark"
+    signature = LWW.ringsign(completeKeys[0][1], ring, message)
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    print("{:>8} {:>10}".format("workers", "verify s"))
+    for workers in counts:
+        if workers > 1:
+            ring.parallel(workers)
+            assert LWW.verify(ring, message, signature, workers=workers)  # warm up the processes
+        start = time.perf_counter()
+        assert LWW.verify(ring, message, signature, workers=workers)
+        print("{:>8} {:>10.3f}".format(workers, time.perf_counter() - start))
+    ring.shutdown()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
@@ -0,0 +1,58 @@
+"""
+Compare the prime search with and without the small-prime sieve.
+Both variants search from the same seeds, the number of BPSW tests and the wall time is reported.
+
+usage: python benchmark/bench_primes.py [rounds]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from libsig import primes
+
+
+class CountingTest:
+    def __init__(self, test):
+        self.test = test
+        self.calls = 0
+
+    def __call__(self, candidate):
+        self.calls += 1
+        return self.test(candidate)
+
+
+def search(seed, bit_count, sieve):
+    for prime in primes._prime_generator(seed, bit_count, sieve=sieve):
+        if prime.bit_length() == bit_count:
+            return prime
+
+
+def run(bit_count, seeds, sieve):
+    counter = CountingTest(primes.is_strong_bpsw_prp)
+    primes.is_strong_bpsw_prp = counter
+    try:
+        start = time.perf_counter()
+        found = [search(seed, bit_count, sieve) for seed in seeds]
+        elapsed = time.perf_counter() - start
+    finally:
+        primes.is_strong_bpsw_prp = counter.test
+    return found, counter.calls, elapsed
+
+
+def main(rounds=5):
+    print("{:>6} {:>8} {:>12} {:>10}".format("bits", "sieve", "bpsw/prime", "s/prime"))
+    for bit_count in (512, 1024, 2048):
+        generator = primes._prime_seed_generator(bit_count)
+        seeds = [next(generator) for _ in range(rounds)]
+        results = []
+        for sieve in (False, True):
+            found, calls, elapsed = run(bit_count, seeds, sieve)
+            results.append(found)
+            print("{:>6} {:>8} {:>12.1f} {:>10.4f}".format(bit_count, str(sieve), calls / rounds, elapsed / rounds))
+        assert results[0] == results[1], "the sieve must not change which prime is found"
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,43 @@
+"""
+Compare the verification of RenHarn ring signatures with every ElGamal equation checked on its own
+and with the randomized batch check, at ring sizes 16..2048.
+
+usage: python benchmark/bench_renharn.py [largest ring size] [key size] [soundness]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from libsig.RenHarn import RenHarn
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    assert function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main(largest=2048, size=1024, soundness=64):
+    message = b"benchmark"
+    pubkeys, privkeys = [], []
+    print("{:>6} {:>12} {:>10} {:>8}".format("ring", "single s", "batch s", "speedup"))
+    for n in (16, 64, 256, 1024, 2048):
+        if n > largest:
+            break
+        while len(pubkeys) < n:
+            if pubkeys:
+                (e, d) = RenHarn.keygen(size, pubkeys[0][1], pubkeys[0][2])
+            else:
+                (e, d) = RenHarn.keygen(size)
+            pubkeys.append(e)
+            privkeys.append(d)
+        sig = RenHarn.ringsign(privkeys[0], pubkeys, message)
+        single = timed(RenHarn.verify, pubkeys, message, sig, soundness=None)
+        batch = timed(RenHarn.verify, pubkeys, message, sig, soundness=soundness)
+        print("{:>6} {:>12.3f} {:>10.3f} {:>8.2f}".format(n, single, batch, single / batch))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""
+Sign and verify latency of RenHarn for a large ring with 1, 2, 4, ... worker processes, up to one per cpu.
+The members are simulated and their equations checked in the workers, the hash chain stays sequential.
+
+usage: python benchmark/bench_renharn_parallel.py [ring size] [key size]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from libsig.RenHarn import RenHarn
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(size=1024, key_size=1024):
+    (e, d) = RenHarn.keygen(key_size)
+    pubkeys, privkeys = [e], [d]
+    while len(pubkeys) < size:
+        (e, d) = RenHarn.keygen(key_size, pubkeys[0][1], pubkeys[0][2])
+        pubkeys.append(e)
+        privkeys.append(d)
+    message = b"benchmark"
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    print("{:>8} {:>10} {:>10}".format("workers", "sign s", "verify s"))
+    for workers in counts:
+        if workers > 1:
+            RenHarn.ringsign(privkeys[0], pubkeys, message, workers=workers)  # warm up the processes
+        sig, sign = timed(RenHarn.ringsign, privkeys[0], pubkeys, message, workers=workers)
+        valid, verify = timed(RenHarn.verify, pubkeys, message, sig, workers=workers)
+        assert valid
+        print("{:>8} {:>10.3f} {:>10.3f}".format(workers, sign, verify))
+    RenHarn.shutdown()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""
+Compare the signing time of RSA keys with 2, 3 and 4 prime factors at modulus sizes of 2048, 3072 and 4096 bits.
+The 2-prime key with a (d, n) tuple is the signing without the chinese remainder theorem.
+Then compare verify_batch with a loop over verify, for an all valid batch and one with a single invalid signature.
+
+usage: python benchmark/bench_rsa.py [signatures]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from libsig.RSAsig import RSAsig
+
+
+def time_signing(privkey, count):
+    messages = [str(i).encode() for i in range(count)]
+    start = time.perf_counter()
+    for message in messages:
+        RSAsig.sign(privkey, message)
+    return (time.perf_counter() - start) / count
+
+
+def bench_signing(count):
+    print("{:>8} {:>7} {:>10} {:>12}".format("modulus", "primes", "keygen s", "sign ms"))
+    for modulus in (2048, 3072, 4096):
+        for prime_count in (2, 3, 4):
+            start = time.perf_counter()
+            pubkey, privkey, primes = RSAsig.keygen(modulus // prime_count, prime_count=prime_count)
+            keygen = time.perf_counter() - start
+            bits = pubkey[1].bit_length()
+            print("{:>8} {:>7} {:>10.2f} {:>12.3f}".format(bits, prime_count, keygen,
+                                                           1000 * time_signing(privkey, count)))
+            if prime_count == 2:
+                print("{:>8} {:>7} {:>10} {:>12.3f}".format(bits, "(d, n)", "",
+                                                           1000 * time_signing(tuple(privkey), count)))
+
+
+
+def bench_verify_batch(count):
+    pubkey, privkey, primes = RSAsig.keygen(1024)
+    messages = [str(i).encode() for i in range(count)]
+    signatures = [RSAsig.sign(privkey, message) for message in messages]
+    invalid = list(signatures)
+    invalid[count // 3] += 1
+    print("{:>8} {:>10} {:>12} {:>12}".format("batch", "invalid", "loop ms", "batch ms"))
+    for batch, bad in ((signatures, 0), (invalid, 1)):
+        start = time.perf_counter()
+        expected = [RSAsig.verify(pubkey, m, s) for m, s in zip(messages, batch)]
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        results = RSAsig.verify_batch(pubkey, messages, batch)
+        batched = time.perf_counter() - start
+        assert results == expected
+        print("{:>8} {:>10} {:>12.2f} {:>12.2f}".format(count, bad, 1000 * loop, 1000 * batched))
+
+
+def main(count=100):
+    bench_signing(count)
+    print()
+    bench_verify_batch(10 * count)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -1,4 +1,4 @@
-from libsig.primes import gen_prime, is_safe_prime
+from libsig.primes import gen_prime, gen_safe_primes
 from libsig import primes
 import gmpy2 as gm
 from hashlib import sha256
@@ -87,21 +87,29 @@ class BasicCamLysParams:
     False
     >>> bcl.verify(e, s, v+1, message)
     False
+
+    With prime_pool=True, the primes e are generated in the background ahead of time,
+    all of the same length, so that one pool serves every message:
+
+    >>> bcl = BasicCamLysParams(primes.safe_prime_1024_1, primes.safe_prime_1024_2, prime_pool=True)
+    >>> (e, s, v) = bcl.sign(message)
+    >>> bcl.verify(e, s, v, message), e.bit_length() == bcl.le
+    (True, True)
     """
     @classmethod
-    def generate_new_keys(cls, size=1024):
+    def generate_new_keys(cls, size=1024, workers=None):
         """
         On input :math:`1^k` , choose a special RSA modulus :math:`n = pq, p = 2p' + 1, q = 2q' + 1`
         of the length :math:`l_n = 2k`.
 
         :param size: size of the primes, k.
+        :param workers: number of processes searching for p and q concurrently, one per cpu by default
         :return: a new instance
         """
-        p = gen_prime(size, extra_check=is_safe_prime)
-        q = gen_prime(size, extra_check=is_safe_prime)
+        p, q = gen_safe_primes(2, size, workers=workers)
         return cls(p, q)
 
-    def __init__(self, p, q, hash_function=sha256):
+    def __init__(self, p, q, hash_function=sha256, prime_pool=False):
         """
         Choose, uniformly at random, a, b, c ∈ :math:`QR_n` .
         Output PK = (n, a, b, c), and SK = p.
@@ -109,6 +117,8 @@ class BasicCamLysParams:
         :param p: a safe prime
         :param q: another safe prime
         :param hash_function: the hash function
+        :param prime_pool: draw the primes e from the shared :class:`libsig.primes.PrimePool`,
+                           instead of generating one on every sign()
         """
         if not gm.is_strong_bpsw_prp(p//2):
             raise ValueError("primes must be safe and p is not, invalid parameters")
@@ -124,6 +134,7 @@ class BasicCamLysParams:
         self._n = p*q
 
         self._hash_function = hash_function
+        self._prime_pool = prime_pool
 
         self._a = generate_quadratic_residue(self.bits, self.modulus)
         self._b = generate_quadratic_residue(self.bits, self.modulus)
@@ -175,6 +186,14 @@ class BasicCamLysParams:
         """
         return self._l
 
+    @property
+    def le(self):
+        """
+        the bit length :math:`l_e = l + 2` of the primes e. A message hash has at most l bits,
+        so :math:`l_e ≥ l_m + 2` holds for every message, and e does not depend on the length of its hash.
+        """
+        return self._l + 2
+
     @property
     def private_key(self):
         """
@@ -206,9 +225,20 @@ class BasicCamLysParams:
         """
         return (pow(self.a, message, self.modulus) * pow(self.b, s, self.modulus) * self.c) % self.modulus
 
+    def generate_e(self, le):
+        """
+        a random prime e of length :math:`l_e`, taken from the prime pool if it is enabled
+
+        :param le: the bit length of e
+        :return: the prime
+        """
+        if self._prime_pool:
+            return primes.get_prime_pool(le).get()
+        return gen_prime(le, secret_prime=False)
+
     def make_sign_params(self, message):
         """
-        On input m, choose a random prime number e of length :math:`l_e ≥ l_m + 2`,
+        On input m, choose a random prime number e of length :math:`l_e ≥ l_m + 2`, see :attr:`le`,
         and a random number s of length :math:`l_s = l_n + l_m + l`, where l is a security parameter.
 
         :param message: the unhashed encoded message
@@ -218,10 +248,9 @@ class BasicCamLysParams:
 
         ln = self.modulus.bit_length()
         lm = m.bit_length()
-        le = lm+2
         ls = lm + ln + self.l
 
-        e = gen_prime(le, secret_prime=False)
+        e = self.generate_e(self.le)
         s = secrets.randbits(ls)
         s = gm.bit_set(s, ls-1)
 
@@ -247,7 +276,8 @@ class BasicCamLysParams:
         """
         To verify that the tuple (e, s, v) is a signature on message m in the message space,
         check that :math:`v^e ≡ a^mb^sc \pmod{n}`,
-        and check that :math:`2^{l_e} > e > 2^{l_e − 1}`.
+        and check that :math:`2^{l_e} > e > 2^{l_m + 1}`, which also accepts the e of length :math:`l_m + 2`
+        of earlier versions.
 
         :param e: the exponent used to sign the message
         :param s: the random integer used to sign the message
@@ -256,8 +286,7 @@ class BasicCamLysParams:
         :return: True, if the message signature is valid
         """
         m = hash_message_as_int(message)
-        le = m.bit_length()+2
-        if not (pow(2, le) > e > pow(2, le-1)):
+        if not (pow(2, self.le) > e > pow(2, m.bit_length()+1)):
             return False
 
         abc = self.calculate_abc(m, s)
@@ -274,14 +303,15 @@ class BlockCamLysParams(BasicCamLysParams):
     True
     """
 
-    def __init__(self, p, q, L):
+    def __init__(self, p, q, L, prime_pool=False):
         """
 
         :param p:
         :param q:
         :param L:
+        :param prime_pool: see :class:`BasicCamLysParams`
         """
-        super().__init__(p, q)
+        super().__init__(p, q, prime_pool=prime_pool)
 
         del self._a
 
@@ -317,10 +347,9 @@ class BlockCamLysParams(BasicCamLysParams):
 
         ln = self._n.bit_length()
         lm = ms[0].bit_length()
-        le = lm+2
         ls = lm + ln + self.l
 
-        e = gen_prime(le, secret_prime=False)
+        e = self.generate_e(self.le)
         s = secrets.randbits(ls)
         s = gm.bit_set(s, ls-1)
 
@@ -1,9 +1,117 @@
 import hashlib
-from random import randint
+import itertools
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from gmpy2 import mpz
 from libsig.primes import *
+from libsig.secrets import randrange, randrange_many
+from libsig.arithmetic import power_function
+from libsig.pool import RefillPool
 from libsig.AbstractRingSignatureScheme import AbstractRingSignatureScheme
 
 
+class _RingTranscript:
+    """
+    The input of the hash chain of LWW, K = [publicKeys, y_Tilde, message, z1, z2], for a fixed ring.
+    The prefix of K is hashed only once, and the hash state is copied for every step of the chain,
+    so that a signature costs O(n) instead of O(n^2) bytes hashed.
+
+    Two encodings of K are supported:
+    "repr" hashes repr(K), which is compatible with signatures of earlier versions,
+    "binary" hashes a canonical encoding, where the integers are big-endian with the width of q,
+    which does not depend on the integer types.
+
+    With the prime order of a subgroup, the challenges are reduced modulo the order,
+    and h is mapped into the subgroup.
+    """
+
+    def __init__(self, publicKeys, q, transcript="repr", order=None):
+        self.q = q
+        self.transcript = transcript
+        self.order = order
+        if transcript == "repr":
+            ringRepr = repr(publicKeys)
+            self.h = LWW.h2(ringRepr.encode(), q)
+            self._ringState = hashlib.sha512(("[" + ringRepr + ", ").encode())
+        elif transcript == "binary":
+            self._width = (int(q).bit_length() + 7) // 8
+            ring = len(publicKeys).to_bytes(8, "big") + b"".join(self.encodeInt(y) for y in publicKeys)
+            self.h = LWW.h2(b"LWW-H2" + ring, q)
+            self._ringState = hashlib.sha512(b"LWW-H1" + ring)
+        else:
+            raise ValueError("Unknown transcript {}, use 'repr' or 'binary'.".format(transcript))
+        if order is not None:
+            self.h = pow(self.h, (q - 1) // order, q)
+
+    def encodeInt(self, value):
+        if not 0 <= value < self.q:
+            raise ValueError("The value is not in the group.")
+        return int(value).to_bytes(self._width, "big")
+
+    def chain(self, y_Tilde, message):
+        """
+        :return: a function mapping (z1, z2) to the next c = H1(K)
+        """
+        state = self._ringState.copy()
+        if self.transcript == "repr":
+            state.update((repr(y_Tilde) + ", " + repr(message) + ", ").encode())
+            # the repr depends on the type, which follows q like in pow(g, s, q) * pow(y, c, q) % q
+            toType = int if isinstance(self.q, int) else mpz
+            encode = lambda z1, z2: (repr(toType(z1)) + ", " + repr(toType(z2)) + "]").encode()
+        else:
+            if not isinstance(message, (bytes, bytearray, memoryview)):
+                # bytes(3) would be b"\0\0\0"
+                raise TypeError("The message must be bytes with the binary transcript.")
+            message = bytes(message)
+            state.update(self.encodeInt(y_Tilde) + len(message).to_bytes(8, "big") + message)
+            encode = lambda z1, z2: self.encodeInt(z1) + self.encodeInt(z2)
+        reduce = self.order or self.q
+
+        def challenge(z1, z2):
+            step = state.copy()
+            step.update(encode(z1, z2))
+            return int.from_bytes(step.digest(), "big") % reduce
+
+        return challenge
+
+
+_workerRing = None
+
+
+def _initRingWorker(publicKeys, q, g, order, transcript):
+    # the ring and the tables of g and h are built once per worker process, and serve every task it gets
+    global _workerRing
+    parameters = (q, g) if order is None else (q, g, order)
+    _workerRing = LWWRing([(y,) + parameters for y in publicKeys], transcript)
+    _workerRing.fixedPowers(1 << 16)
+
+
+def _ringWorker(exponents):
+    powG, powH = _workerRing.fixedPowers()
+    return [(powG(s), powH(s)) for s in exponents]
+
+
+def _verifyWorker(messages, signatures):
+    return [LWW.verify(_workerRing, message, signature) for message, signature in zip(messages, signatures)]
+
+
+_keygenParameters = None
+
+
+def _initKeygenWorker(q, g, order):
+    global _keygenParameters
+    bound = order or q
+    _keygenParameters = (power_function(g, q, int(bound).bit_length(), 1 << 16), bound,
+                         LWWKeyStore.width(q), LWWKeyStore.width(bound))
+
+
+def _keygenWorker(count):
+    powG, bound, width, privateWidth = _keygenParameters
+    return b"".join(int(powG(x)).to_bytes(width, "big") + int(x).to_bytes(privateWidth, "big")
+                    for x in randrange_many(1, bound, count))
+
+
 class LWW(AbstractRingSignatureScheme):
     """
     Implementation of a RingSign Algorithm
@@ -43,84 +151,160 @@ class LWW(AbstractRingSignatureScheme):
         return z
 
     @staticmethod
-    def __verifyQandG(completePublicKeys):
+    def ring(completePublicKeys, transcript=None):
         """
-        Verifies that all publicKeys have the same q and g and returns them
-        :param completePublicKeys: List of Public Keys with q and g (y, q, g)
-        :return: (publicKeys,q,g) if all q and g are the same, else a error is raised.
-                publicKeys = only public keys without q and g
+        Returns the LWWRing for the public keys, or the ring itself if one is given
+        :param completePublicKeys: A LWWRing or a List of Public Keys with q and g (y, q, g)
+        :param transcript: The transcript of the ring, None for the one of the given ring or "repr"
+        :return: The LWWRing
         """
-        q = completePublicKeys[0][1]
-        g = completePublicKeys[0][2]
-        publicKeys = []
-        for completePubKey in completePublicKeys:
-            if q != completePubKey[1]:
-                raise ValueError("A q is not equal to the others, check your keys")
-            if g != completePubKey[2]:
-                raise ValueError("A g is not equal to the others, check your keys")
-            publicKeys.append(completePubKey[0])
-
-        return publicKeys, q, g
+        if isinstance(completePublicKeys, LWWRing):
+            if transcript is not None and transcript != completePublicKeys.transcript:
+                raise ValueError("The ring uses the transcript {}.".format(completePublicKeys.transcript))
+            return completePublicKeys
+        return LWWRing(completePublicKeys, transcript or "repr")
 
     # ------ Begin Implementation of AbstractRingSignatureScheme -----
 
     @staticmethod
-    def keygen(q=0, g=0):
+    def keygen(q=0, g=0, group=1024, order=0):
         """
         Creates Private and Public key of optional given q and g
-        If no arguments are given, default values will be used
+        If no q is given, q and g of a standard group are used, see libsig.primes.get_group
+
+        With the order of g, the keys work in the prime order subgroup generated by g, where all
+        exponents are reduced modulo the order. A subgroup with a 256 bit order, like the standard
+        group "modp1024-q256", makes the exponents and so every exponentiation about 4 times cheaper
+        than in the safe prime groups. The order is then part of the keys.
+
+        >>> y, x, q, g, order = LWW.keygen(group="modp1024-q256")
+        >>> q.bit_length(), order.bit_length(), pow(y, order, q)
+        (1024, 256, mpz(1))
+
         :param q: Order of group G
         :param g: Generator of Group G with the prime order q
-        :return: [y=public, x=private, q=Order, g=Generator]
+        :param group: Name or size of the standard group used without q
+        :param order: The prime order of g, which selects the subgroup mode. The standard groups
+                      with a short order, e.g. "modp1024-q256", select it on their own
+        :return: [y=public, x=private, q=Order, g=Generator], and the order of g in the subgroup mode
+        """
+        q, g, order = LWW.__group(q, g, group, order)
+
+        if order:
+            x = randrange(1, order)
+            y = pow(g, x, q)
+            return [y, x, q, g, order]
+        x = randrange(1, q)
+        y = pow(g, x, q)
+        return [y, x, q, g]
+
+    @staticmethod
+    def __group(q, g, group, order):
+        """
+        :return: (q, g, order) of keygen
         """
         if q == 0:
-            q = safe_prime_1024_1
+            standardGroup = get_group(group)
+            q = standardGroup.p
+            if g == 0:
+                g = standardGroup.g
+                if order == 0 and standardGroup.q != q // 2:
+                    order = standardGroup.q
         if g == 0:
             g = 123456
+        return q, g, order
 
-        x = randint(1, q - 1)
-        y = pow(g, x, q)
-        return [y, x, q, g]
+    @staticmethod
+    def keygen_bulk(path, count, q=0, g=0, group=1024, order=0, workers=None, chunk=1024):
+        """
+        Creates count keys like keygen and streams them into a LWWKeyStore file, which holds q, g and the order once
+        and fixed width records of y and x. g is raised with a FixedBase table, which takes a few dozen
+        multiplications per key instead of a whole exponentiation.
+        The file holds private keys and is only readable by its owner.
+        :param path: The file of the key store, it is overwritten
+        :param count: The number of keys
+        :param q: Order of group G, see keygen
+        :param g: Generator of Group G with the prime order q, see keygen
+        :param group: Name or size of the standard group used without q, see keygen
+        :param order: The prime order of g, which selects the subgroup mode, see keygen
+        :param workers: The number of processes generating the keys, None for one per cpu
+        :param chunk: The number of keys a process generates at once
+        :return: The LWWKeyStore
+        """
+        q, g, order = LWW.__group(q, g, group, order)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        sizes = [min(chunk, count - start) for start in range(0, count, chunk)]
+        # the keys are written to a new file, which replaces the old one at the end, so that private keys never
+        # land in a file with looser permissions and a store of the old file mapped elsewhere stays intact
+        temporary = path + ".tmp"
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(descriptor, 0o600)
+        with os.fdopen(descriptor, "wb") as store:
+            store.write(LWWKeyStore.header(q, g, order))
+            if workers <= 1:
+                _initKeygenWorker(q, g, order)
+                for size in sizes:
+                    store.write(_keygenWorker(size))
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_initKeygenWorker,
+                                         initargs=(q, g, order)) as executor:
+                    for records in executor.map(_keygenWorker, sizes):
+                        store.write(records)
+        os.replace(temporary, path)
+        return LWWKeyStore(path)
 
     @staticmethod
-    def ringsign(privateKeyUser, completePublicKeys, message):
+    def ringsign(privateKeyUser, completePublicKeys, message, transcript=None, workers=1):
         """
         Signs the message with the given privateKey of the user and the public keys
         Is using the algorithm of "Linkable Spontaneous Anonymous Group Signature for Ad Hoc Groups"
         :param privateKeyUser: The private Key of the User
-        :param completePublicKeys:  A List of Public Keys with the form [y=public, x=private, q=Order, g=Generator]
+        :param completePublicKeys:  A LWWRing or a List of Public Keys with the form [y=public, q=Order, g=Generator]
+                                    or [y, q, g, order of g] in the subgroup mode, see keygen
         :param message: Just a random message
+        :param transcript: The encoding of the hash input, "repr" (default) or the faster and canonical "binary",
+                           the signature must be verified with the same transcript
+        :param workers: The number of processes computing g^s_i and h^s_i, None for one per cpu, see LWWRing.powers
         :return: The signature in the form of [C1, [S1, ..., Sn], y~]
+
+        If the precomputation of the ring is running, see LWWRing.precompute, u, s_i, g^u, h^u, g^s_i and h^s_i
+        are taken from it, and only y_i^c_i and y~^c_i are left to compute.
         """
-        publicKeys, q, g = LWW.__verifyQandG(completePublicKeys)
+        ring = LWW.ring(completePublicKeys, transcript)
+        publicKeys, q = ring.publicKeys, ring.q
         publicKeysLength = len(publicKeys)
-        userIndex = publicKeys.index(pow(g, privateKeyUser, q))
+        userIndex = ring.signerIndex(privateKeyUser)
 
         # Part 1
-        h = LWW.h2(repr(publicKeys).encode(), q)
-        y_Tilde = pow(h, privateKeyUser, q)
+        y_Tilde = ring.yTilde(privateKeyUser)
+        challenge = ring.chain(y_Tilde, message)
+        powYTilde = power_function(y_Tilde, q, ring.exponentBits, publicKeysLength)
+        if ring.precomputation is not None:
+            commitments = ring.precomputation.get()
+        else:
+            commitments = ring.commitments(publicKeysLength, workers)
 
         # Part 2
-        u = randint(1, q - 1)
-        K = [publicKeys, y_Tilde, message, pow(g, u, q), pow(h, u, q)]
+        u, gU, hU = commitments[0]
 
         # Part 3
         s = [-1] * publicKeysLength
         c = [-1] * publicKeysLength
         i = (userIndex + 1) % publicKeysLength
-        c[i] = LWW.h1(repr(K).encode(), q)
+        c[i] = challenge(gU, hU)
+        randomS = iter(commitments[1:])
         while i != userIndex:
-            si = randint(1, q - 1)
+            si, gS, hS = next(randomS)
             s[i] = si
 
-            z1 = (pow(g, si, q) * pow(publicKeys[i], c[i], q)) % q
-            z2 = (pow(h, si, q) * pow(y_Tilde, c[i], q)) % q
-            K = [publicKeys, y_Tilde, message, z1, z2]
+            z1 = (gS * pow(publicKeys[i], c[i], q)) % q
+            z2 = (hS * powYTilde(c[i])) % q
             i = (i + 1) % publicKeysLength
-            c[i] = LWW.h1(repr(K).encode(), q)
+            c[i] = challenge(z1, z2)
 
         # Part 4
-        s[userIndex] = (u - privateKeyUser * c[userIndex]) % (q-1)
+        s[userIndex] = (u - privateKeyUser * c[userIndex]) % (ring.order or q-1)
 
         # Finish
         sig = [c[0], s, y_Tilde]
@@ -128,15 +312,22 @@ class LWW(AbstractRingSignatureScheme):
         return sig
 
     @staticmethod
-    def verify(completePublicKeys, message, signature):
+    def verify(completePublicKeys, message, signature, transcript=None, workers=1, linkIndex=None):
         """
         Verifies that the given message is signed by one of the public key users
-        :param completePublicKeys:  A List of Public Keys with the form [y=public, q=Order, g=Generator]
+        :param completePublicKeys:  A LWWRing or a List of Public Keys with the form [y=public, q=Order, g=Generator]
+                                    or [y, q, g, order of g] in the subgroup mode, see keygen
         :param message: Just a random message
         :param signature: The signature in the form of [C1, [S1, ..., Sn], y~]
+        :param transcript: The encoding of the hash input used for signing, "repr" or "binary"
+        :param workers: The number of processes computing g^s_i and h^s_i, None for one per cpu, see LWWRing.powers
+        :param linkIndex: A libsig.linkability.LinkIndex of the tags y~ accepted before. A signature linked to one
+                          of them is rejected by link_check before the ring is verified, and the tag of an accepted
+                          signature is added, with the sha256 digest of the message as reference
         :return: 'True' if accepted, 'False' if not
         """
-        publicKeys, q, g = LWW.__verifyQandG(completePublicKeys)
+        ring = LWW.ring(completePublicKeys, transcript)
+        publicKeys, q = ring.publicKeys, ring.q
         publicKeysLength = len(publicKeys)
 
         c1 = signature[0]
@@ -146,20 +337,427 @@ class LWW(AbstractRingSignatureScheme):
         if publicKeysLength != len(signature[1]):
             raise ValueError("The length of the public Keys does not match to the length of signatures/ secrets")
 
+        if not 0 <= y_Tilde < q:
+            return False
+        if linkIndex is not None and LWW.link_check(ring, signature, linkIndex) is not None:
+            return False
+        if ring.order and not ring.inSubgroup(y_Tilde):
+            return False
+
         # Part 1
         c_i = c1
-        h = LWW.h2(repr(publicKeys).encode(), q)
+        challenge = ring.chain(y_Tilde, message)
+        powYTilde = power_function(y_Tilde, q, ring.exponentBits, publicKeysLength)
 
-        for i in range(0, publicKeysLength):
-            z1 = (pow(g, singleSignatures[i], q) * pow(publicKeys[i], c_i, q)) % q
-            z2 = (pow(h, singleSignatures[i], q) * pow(y_Tilde, c_i, q)) % q
-            K = [publicKeys, y_Tilde, message, z1, z2]
-            c_i = LWW.h1(repr(K).encode(), q)
+        for y, (gS, hS) in zip(publicKeys, ring.powers(singleSignatures, workers)):
+            z1 = (gS * pow(y, c_i, q)) % q
+            z2 = (hS * powYTilde(c_i)) % q
+            c_i = challenge(z1, z2)
 
         # Part 2
         if c1 == c_i:
+            if linkIndex is not None:
+                # the check above may have raced with another verification of the same signer
+                return linkIndex.add(ring.fingerprint, ring.linkTag(y_Tilde), hashlib.sha256(message).digest()) is None
             return True
         else:
             return False
 
+    @staticmethod
+    def verify_batch(completePublicKeys, messages, signatures, transcript=None, workers=None):
+        """
+        Verifies many signatures in the same ring. The setup of the ring is shared, the structure of all signatures
+        is checked before any of them is verified, and the signatures are verified by the process pool of the ring,
+        see LWWRing.parallel, in chunks of many signatures each.
+        :param completePublicKeys: A LWWRing or a List of Public Keys, see verify
+        :param messages: The messages
+        :param signatures: The signatures of the messages, in the form of [C1, [S1, ..., Sn], y~]
+        :param transcript: The encoding of the hash input used for signing, "repr" or "binary"
+        :param workers: The number of processes, None for one per cpu, with 1 the signatures are verified in this process
+        :return: A list of 'True' or 'False' for the signatures, in their order, 'False' also for a y~ out of range
+        """
+        ring = LWW.ring(completePublicKeys, transcript)
+        messages = list(messages)
+        signatures = list(signatures)
+        if len(messages) != len(signatures):
+            raise ValueError("The number of messages does not match to the number of signatures")
+        for signature in signatures:
+            if len(signature) != 3 or len(signature[1]) != len(ring):
+                raise ValueError("A signature is not of the form [C1, [S1, ..., Sn], y~] for the ring")
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or len(signatures) < 2:
+            ring.fixedPowers(len(ring) * len(signatures))
+            return [LWW.verify(ring, message, signature) for message, signature in zip(messages, signatures)]
+        size = -(-len(signatures) // (4 * workers))
+        starts = range(0, len(signatures), size)
+        chunks = ring.parallel(workers).map(_verifyWorker, [messages[i:i + size] for i in starts],
+                                            [signatures[i:i + size] for i in starts])
+        return list(itertools.chain.from_iterable(chunks))
+
+    @staticmethod
+    def link_check(completePublicKeys, signature, linkIndex):
+        """
+        Looks up the tag y~ of the signature in the index, which takes O(1) instead of the O(n) of verify.
+        The index holds the canonical form of y~, see LWWRing.linkTag, so that the signer can't evade it with -y~.
+        The fingerprint of the ring and h depend on the transcript, so a key has different tags under "repr" and
+        "binary": a deployment must accept only one transcript per ring.
+        :param completePublicKeys: A LWWRing or a List of Public Keys, see verify
+        :param signature: The signature in the form of [C1, [S1, ..., Sn], y~]
+        :param linkIndex: A libsig.linkability.LinkIndex
+        :return: The reference of the earlier signature of the same signer in the ring, None if there is none
+        """
+        ring = LWW.ring(completePublicKeys)
+        return linkIndex.lookup(ring.fingerprint, ring.linkTag(signature[2]))
+
     # ------ End Implementation of AbstractRingSignatureScheme -----
+
+
+class LWWRing:
+    """
+    The setup of LWW for one ring, which is the same for every signature in it:
+    the validated q and g, the public keys, h = H2(publicKeys), the position of each key,
+    and y~ = h^x of the signers. In the subgroup mode, see LWW.keygen, also the order of g. Passing a LWWRing instead of the list of public keys
+    to LWW.ringsign and LWW.verify skips all of that on repeated calls.
+
+    >>> completeKeys = [LWW.keygen() for _ in range(3)]
+    >>> ring = LWWRing([(y, q, g) for y, x, q, g in completeKeys])
+    >>> message = str.encode("You can't stump the Trump!")
+    >>> signature = LWW.ringsign(completeKeys[1][1], ring, message)
+    >>> LWW.verify(ring, message, signature)
+    True
+    >>> ring.signerIndex(completeKeys[1][1])
+    1
+    """
+
+    def __init__(self, completePublicKeys, transcript="repr"):
+        """
+        :param completePublicKeys: List of Public Keys with q and g (y, q, g), or (y, q, g, order of g)
+        :param transcript: The encoding of the hash input, see LWW.ringsign
+        """
+        self.publicKeys, self.q, self.g, self.order = LWWRing.__verifyQandG(completePublicKeys)
+        if self.order is not None and pow(self.g, self.order, self.q) != 1:
+            raise ValueError("The order does not match to g, check your keys")
+        # the bit length of the exponents, which are reduced modulo the order in the subgroup mode
+        self.exponentBits = int(self.order or self.q).bit_length()
+        self.transcript = transcript
+        self._ringTranscript = _RingTranscript(self.publicKeys, self.q, transcript, self.order)
+        self.h = self._ringTranscript.h
+        self.index = {}
+        for i, y in enumerate(self.publicKeys):
+            self.index.setdefault(y, i)
+        self._signers = {}
+        self._fixedPowers = None
+        self.precomputation = None
+        self._executor = None
+        self._executorWorkers = None
+        self._fingerprint = None
+
+    @staticmethod
+    def __verifyQandG(completePublicKeys):
+        """
+        Verifies that all publicKeys have the same q, g and order and returns them
+        :param completePublicKeys: List of Public Keys with q and g (y, q, g), or (y, q, g, order of g)
+        :return: (publicKeys,q,g,order) if all q, g and orders are the same, else a error is raised.
+                publicKeys = only public keys without q and g, order = None without orders
+        """
+        q = completePublicKeys[0][1]
+        g = completePublicKeys[0][2]
+        order = completePublicKeys[0][3] if len(completePublicKeys[0]) > 3 else None
+        publicKeys = []
+        for completePubKey in completePublicKeys:
+            if q != completePubKey[1]:
+                raise ValueError("A q is not equal to the others, check your keys")
+            if g != completePubKey[2]:
+                raise ValueError("A g is not equal to the others, check your keys")
+            if order != (completePubKey[3] if len(completePubKey) > 3 else None):
+                raise ValueError("An order is not equal to the others, check your keys")
+            publicKeys.append(completePubKey[0])
+
+        return publicKeys, q, g, order
+
+    def __len__(self):
+        return len(self.publicKeys)
+
+    def __signer(self, privateKey):
+        signer = self._signers.get(privateKey)
+        if signer is None:
+            y = pow(self.g, privateKey, self.q)
+            if y not in self.index:
+                raise ValueError("The private key does not belong to a member of the ring")
+            signer = (self.index[y], pow(self.h, privateKey, self.q))
+            self._signers[privateKey] = signer
+        return signer
+
+    def signerIndex(self, privateKey):
+        """
+        :return: The position of the public key of the private key in the ring
+        """
+        return self.__signer(privateKey)[0]
+
+    def yTilde(self, privateKey):
+        """
+        :return: The linkability tag y~ = h^x of the private key
+        """
+        return self.__signer(privateKey)[1]
+
+    def linkTag(self, y_Tilde):
+        """
+        The canonical form of y~ in a libsig.linkability.LinkIndex: min(y~, q - y~).
+        Outside of the subgroup mode y~ is not checked to be in the subgroup of h, and a signer whose challenge c
+        is even can sign again with -y~ = q - y~, as (-y~)^c = y~^c. Both have the same canonical form.
+        For a safe prime q, -1 is the only such factor a signer can use.
+        """
+        return min(y_Tilde, self.q - y_Tilde)
+
+    @property
+    def fingerprint(self):
+        """
+        The sha256 digest of the ring: q, g, the order, the transcript and the public keys in their order,
+        which identifies the ring in a libsig.linkability.LinkIndex.
+        As it depends on the transcript, like h does, the tags of a key differ between the transcripts.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256(b"LWW-ring" + self.transcript.encode())
+            for value in [self.q, self.g, self.order or 0, len(self)] + self.publicKeys:
+                value = int(value)
+                length = (value.bit_length() + 7) // 8
+                digest.update(length.to_bytes(4, "big") + value.to_bytes(length, "big"))
+            self._fingerprint = digest.digest()
+        return self._fingerprint
+
+    def inSubgroup(self, value):
+        """
+        :return: True if value is an element of the subgroup of g other than 1, in the subgroup mode
+        """
+        return 1 < value < self.q and pow(value, self.order, self.q) == 1
+
+    def fixedPowers(self, uses=None):
+        """
+        g and h are raised to a power for every member in every signature, so their powers are
+        precomputed once for the ring, see libsig.arithmetic.FixedBase
+        :param uses: The expected number of powers, which decides on the first call how large the tables are,
+                     by default len(ring)
+        :return: the functions s -> g^s mod q and s -> h^s mod q
+        """
+        if self._fixedPowers is None:
+            uses = len(self) if uses is None else uses
+            self._fixedPowers = (power_function(self.g, self.q, self.exponentBits, uses),
+                                 power_function(self.h, self.q, self.exponentBits, uses))
+        return self._fixedPowers
+
+    def powers(self, exponents, workers=1):
+        """
+        g^s and h^s for all exponents s. They do not depend on the hash chain, so with workers > 1 they are
+        computed in chunks by a process pool, which gets q, g and h only once, see parallel.
+        The chunks are yielded in order as soon as they are ready, so that the sequential rest of
+        the hash chain overlaps with the computation of the later chunks.
+        :param exponents: The list of exponents
+        :param workers: The number of processes, None for one per cpu
+        :return: An iterator of (g^s mod q, h^s mod q)
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1:
+            powG, powH = self.fixedPowers()
+            return ((powG(s), powH(s)) for s in exponents)
+        exponents = list(exponents)
+        size = max(16, -(-len(exponents) // (4 * workers)))
+        chunks = [exponents[i:i + size] for i in range(0, len(exponents), size)]
+        return itertools.chain.from_iterable(self.parallel(workers).map(_ringWorker, chunks))
+
+    def parallel(self, workers=None):
+        """
+        The process pool of the ring, which is started on first use and kept for the next signatures,
+        until shutdown is called or another number of workers is requested.
+        Every worker process gets the ring once, when it starts.
+        :param workers: The number of processes, None for one per cpu
+        :return: The ProcessPoolExecutor
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if self._executor is not None and self._executorWorkers != workers:
+            self.shutdown()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_initRingWorker,
+                                                 initargs=(self.publicKeys, self.q, self.g, self.order,
+                                                           self.transcript))
+            self._executorWorkers = workers
+        return self._executor
+
+    def shutdown(self):
+        """
+        Stops the process pool of the ring, if there is one.
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def commitments(self, count, workers=1):
+        """
+        The part of a signature which does not depend on the message: random exponents with their powers of g and h
+        :param count: The number of exponents, len(ring) for u and the s_i of the other members
+        :param workers: The number of processes, see powers
+        :return: A list of (s, g^s mod q, h^s mod q)
+        """
+        exponents = randrange_many(1, self.order or self.q, count)
+        return [(s, gS, hS) for s, (gS, hS) in zip(exponents, self.powers(exponents, workers))]
+
+    def precompute(self, depth=16, low=None, start=True):
+        """
+        Starts the offline phase of signing: a background thread keeps up to depth commitments
+        for whole signatures in store, which LWW.ringsign uses instead of computing them.
+        :param depth: The number of signatures to precompute
+        :param low: The store is refilled when fewer are left, default depth // 4, at least 1
+        :param start: Whether to start the background thread
+        :return: The LWWPrecomputation, its metrics() tell how many stored signatures were used
+        """
+        if self.precomputation is not None:
+            self.precomputation.stop()
+        self.precomputation = LWWPrecomputation(self, depth, low, start)
+        return self.precomputation
+
+    def chain(self, y_Tilde, message):
+        """
+        :return: a function mapping (z1, z2) to the next c of the hash chain
+        """
+        return self._ringTranscript.chain(y_Tilde, message)
+
+
+class LWWPrecomputation(RefillPool):
+    """
+    A store of the message independent part of LWW signatures for a ring, see LWWRing.precompute.
+    Every entry is used for one signature only, as reusing u would reveal the private key.
+    For the same reason, a forked child process starts with an empty store.
+
+    >>> completeKeys = [LWW.keygen() for _ in range(3)]
+    >>> ring = LWWRing([(y, q, g) for y, x, q, g in completeKeys])
+    >>> precomputation = ring.precompute(depth=2)
+    >>> precomputation.wait_filled(timeout=30)
+    True
+    >>> message = str.encode("You can't stump the Trump!")
+    >>> LWW.verify(ring, message, LWW.ringsign(completeKeys[0][1], ring, message))
+    True
+    >>> precomputation.metrics()["used"]
+    1
+    >>> precomputation.stop()
+    """
+
+    def __init__(self, ring, depth=16, low=None, start=True):
+        """
+        :param ring: The LWWRing
+        :param depth: The number of signatures to keep in store
+        :param low: The store is refilled when fewer are left, default depth // 4, at least 1
+        :param start: Whether to start the background thread
+        """
+        self.ring = ring
+        super().__init__(max(1, depth // 4) if low is None else low, depth, start, name="LWWPrecomputation")
+
+    def _generate(self, count):
+        for _ in range(count):
+            yield self.ring.commitments(len(self.ring))
+
+    def _generate_now(self):
+        return self.ring.commitments(len(self.ring))
+
+    def metrics(self):
+        """
+        The metrics of RefillPool, and used: the number of signatures which used a stored entry
+        """
+        metrics = super().metrics()
+        metrics["used"] = metrics["drawn"] - metrics["misses"]
+        return metrics
+
+
+class LWWKeyStore:
+    """
+    A file of LWW keys of one group, made by LWW.keygen_bulk.
+    It starts with b"LWWKEYS1", the byte width of q and the byte width of the private keys as 4 bytes each,
+    and q, g and the order (0 without one) with the width of q. Then it holds a record per key,
+    y with the width of q and x with the width of the private keys, all big-endian.
+    The numbers are returned as mpz, like the ones of the standard groups.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "ring.keys")
+    >>> store = LWW.keygen_bulk(path, 3, group="modp1024-q256", workers=1)
+    >>> y, x, q, g, order = store.completeKey(1)
+    >>> len(store), y == pow(g, x, q)
+    (3, True)
+    >>> message = str.encode("You can't stump the Trump!")
+    >>> ring = store.ring()
+    >>> LWW.verify(ring, message, LWW.ringsign(x, ring, message))
+    True
+    >>> store.close()
+    """
+    MAGIC = b"LWWKEYS1"
+
+    def __init__(self, path):
+        """
+        :param path: The file of the key store
+        """
+        with open(path, "rb") as store:
+            self._map = mmap.mmap(store.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != LWWKeyStore.MAGIC:
+            self._map.close()
+            raise ValueError("{} is not a LWW key store".format(path))
+        self._width = int.from_bytes(self._map[8:12], "big")
+        self._privateWidth = int.from_bytes(self._map[12:16], "big")
+        self.q, self.g, self.order = [self.__number(16 + i * self._width, self._width) for i in range(3)]
+        self.order = self.order or None
+        self._start = 16 + 3 * self._width
+        self._recordSize = self._width + self._privateWidth
+        # a record which was only partly written is ignored
+        self._count = (len(self._map) - self._start) // self._recordSize
+
+    @staticmethod
+    def width(value):
+        """
+        :return: The number of bytes of value
+        """
+        return (int(value).bit_length() + 7) // 8
+
+    @staticmethod
+    def header(q, g, order):
+        """
+        :return: The start of a key store file for the group
+        """
+        width = LWWKeyStore.width(q)
+        return (LWWKeyStore.MAGIC + width.to_bytes(4, "big") + LWWKeyStore.width(order or q).to_bytes(4, "big") +
+                b"".join(int(value).to_bytes(width, "big") for value in (q, g, order or 0)))
+
+    def __number(self, offset, width):
+        return mpz(int.from_bytes(self._map[offset:offset + width], "big"))
+
+    def __len__(self):
+        return self._count
+
+    def __group(self):
+        return (self.q, self.g) if self.order is None else (self.q, self.g, self.order)
+
+    def completeKey(self, index):
+        """
+        :return: The key at the index, like LWW.keygen returns it
+        """
+        if not 0 <= index < self._count:
+            raise IndexError("key store index out of range")
+        offset = self._start + index * self._recordSize
+        y = self.__number(offset, self._width)
+        x = self.__number(offset + self._width, self._privateWidth)
+        return [y, x] + list(self.__group())
+
+    def publicKeys(self):
+        """
+        :return: The list of the public keys, in the form (y, q, g) or (y, q, g, order of g)
+        """
+        group = self.__group()
+        return [(self.__number(self._start + i * self._recordSize, self._width),) + group for i in range(self._count)]
+
+    def ring(self, transcript="repr"):
+        """
+        :return: The LWWRing of all keys in the store
+        """
+        return LWWRing(self.publicKeys(), transcript)
+
+    def close(self):
+        self._map.close()
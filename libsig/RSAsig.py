@@ -1,9 +1,87 @@
 from libsig.AbstractSignatureScheme import AbstractSignatureScheme
-from libsig.primes import gen_prime
+from libsig.primes import gen_primes
+from libsig.pool import RefillPool
+from libsig.secrets import token_hex
+from concurrent.futures import ProcessPoolExecutor, CancelledError, as_completed
 import gmpy2 as gm
+import json
+import os
+import time
 from hashlib import sha256
 
 
+def _product(values):
+    result = 1
+    for value in values:
+        result *= value
+    return result
+
+
+class RSAPrivateKey:
+    """An RSA private key which keeps the primes, so that it can sign by the chinese remainder theorem.
+    Besides p and q, a multi-prime key has further primes r_i, stored like the otherPrimeInfos of PKCS #1
+    as (r_i, d_i, t_i) with :math:`t_i = (p q r_3 \\cdots r_{i-1})^{-1} \\pmod{r_i}`.
+    It unpacks like the (d, n) tuple, so code expecting a tuple keeps working.
+
+    >>> key = RSAPrivateKey(61, 53, 17)
+    >>> d, n = key
+    >>> key.power(65) == pow(65, d, n)
+    True
+    >>> key = RSAPrivateKey(61, 53, 17, other_primes=[59, 67])
+    >>> key.n == 61 * 53 * 59 * 67 and key.power(65) == pow(65, key.d, key.n)
+    True
+    """
+    __slots__ = ("p", "q", "e", "n", "d", "dP", "dQ", "qInv", "others")
+
+    def __init__(self, p, q, e=65537, other_primes=()):
+        self.p = gm.mpz(p)
+        self.q = gm.mpz(q)
+        self.e = gm.mpz(e)
+        primes = [self.p, self.q] + [gm.mpz(r) for r in other_primes]
+        self.n = gm.mpz(1)
+        phi = gm.mpz(1)
+        for prime in primes:
+            self.n *= prime
+            phi *= prime - 1
+        self.d = gm.invert(self.e, phi)
+        self.dP = self.d % (self.p - 1)
+        self.dQ = self.d % (self.q - 1)
+        self.qInv = gm.invert(self.q, self.p)
+        self.others = []
+        r = self.p * self.q
+        for prime in primes[2:]:
+            self.others.append((prime, self.d % (prime - 1), gm.invert(r, prime)))
+            r *= prime
+
+    @property
+    def primes(self):
+        """all prime factors of n"""
+        return (self.p, self.q) + tuple(r for r, _, _ in self.others)
+
+    def __iter__(self):
+        return iter((self.d, self.n))
+
+    def __getitem__(self, index):
+        return (self.d, self.n)[index]
+
+    def __repr__(self):
+        return "RSAPrivateKey(n={:d})".format(int(self.n))
+
+    def power(self, x):
+        """returns x^d mod n, computed modulo each prime and recombined with Garner's formula."""
+        m1 = gm.powmod(x, self.dP, self.p)
+        m2 = gm.powmod(x, self.dQ, self.q)
+        h = (self.qInv * (m1 - m2)) % self.p
+        m = m2 + h * self.q
+        r = self.p * self.q
+        for prime, d_i, t_i in self.others:
+            m_i = gm.powmod(x, d_i, prime)
+            h = ((m_i - m) * t_i) % prime
+            m += r * h
+            r *= prime
+        return m
+
+
 class RSAsig(AbstractSignatureScheme):
     """This class implements the well known RSA-signature scheme.
     
@@ -14,6 +92,8 @@ class RSAsig(AbstractSignatureScheme):
     True
     >>> RSAsig.verify(pubkey, message, signature+1)
     False
+    >>> signature == RSAsig.sign(tuple(privkey), message)
+    True
     >>> gm.bit_length(pubkey[1])
     2048
     >>> gm.bit_length(primes[0])
@@ -22,23 +102,39 @@ class RSAsig(AbstractSignatureScheme):
     1024
     """
     @staticmethod
-    def keygen(size=1024):
-        # generate the primes
-        p = int(gen_prime(size, secret_prime=True))
-        q = int(gen_prime(size, secret_prime=True))  # this can be sped up, must read more libgcrypt :D
-        n = p*q
+    def keygen(size=1024, workers=None, prime_count=2):
+        """returns a (public, private)-keypair and the primes.
+        The modulus is the product of *prime_count* primes of *size* bits each,
+        more primes make signing cheaper for the same modulus size.
+        The primes are searched for concurrently by *workers* processes, one per cpu by default.
+
+        >>> (pubkey, privkey, primes) = RSAsig.keygen(512, prime_count=3)
+        >>> len(primes), gm.bit_length(pubkey[1])
+        (3, 1536)
+        """
+        if not 2 <= prime_count <= 4:
+            raise ValueError("prime_count must be between 2 and 4")
         e = 65537
-        d = gm.invert(e, (p-1)*(q-1))
-        pubkey = (e, n)
-        privkey = (d, n)
-        primes = (p, q)
-        return pubkey, privkey, primes
+        # generate the primes
+        primes = [int(prime) for prime in gen_primes(prime_count, size, secret_prime=True, workers=workers)]
+        # with more than two primes their product can fall one bit short, and e must be invertible
+        while gm.bit_length(_product(primes)) < prime_count * size or any((r - 1) % e == 0 for r in primes):
+            primes.sort()
+            replacement = int(gen_primes(1, size, secret_prime=True, workers=workers)[0])
+            if replacement not in primes:
+                primes[0] = replacement
+        privkey = RSAPrivateKey(primes[0], primes[1], e, other_primes=primes[2:])
+        pubkey = (e, int(privkey.n))
+        return pubkey, privkey, tuple(primes)
 
     @staticmethod
     def sign(privkey, message):
-        """returns a signature."""
-        d, n = privkey
+        """returns a signature. privkey is either an RSAPrivateKey,
+        which signs using the chinese remainder theorem, or a (d, n) tuple."""
         hash_as_int = int(sha256(message).hexdigest(), 16)
+        if isinstance(privkey, RSAPrivateKey):
+            return privkey.power(hash_as_int)
+        d, n = privkey
         return pow(hash_as_int, d, n)
 
     @staticmethod
@@ -47,3 +143,163 @@ class RSAsig(AbstractSignatureScheme):
         e, n = pubkey
         hash_as_int = int(sha256(message).hexdigest(), 16)
         return pow(signature, e, n) == hash_as_int
+
+    @staticmethod
+    def verify_batch(pubkey, messages, signatures):
+        """screens a batch of signatures, and returns a list which is False at the index of every
+        signature found to be incorrect, and True elsewhere.
+        The whole batch is screened at once by checking
+        :math:`(\\prod_i s_i)^e \\equiv \\prod_i H(m_i) \\pmod{n}`, which costs one multiplication
+        per signature and message instead of an exponentiation. Only if that fails, the batch is
+        bisected to find the incorrect signatures.
+
+        This is screening, not batch verification: True does NOT mean that :func:`verify` would
+        accept the signature. A passing batch only means that every message was signed with the
+        private key at some point. E.g. multiplying one signature with x and another with x^-1,
+        or replacing two signatures s with n - s, passes the screen. False is exact, :func:`verify`
+        rejects every signature marked False. Use :func:`verify` where the signature itself is
+        stored or forwarded.
+
+        >>> (pubkey, privkey, primes) = RSAsig.keygen(512)
+        >>> messages = [str(i).encode() for i in range(5)]
+        >>> signatures = [RSAsig.sign(privkey, message) for message in messages]
+        >>> signatures[3] += 1
+        >>> RSAsig.verify_batch(pubkey, messages, signatures)
+        [True, True, True, False, True]
+        >>> signatures[3] -= 1
+        >>> signatures[0], signatures[1] = pubkey[1] - signatures[0], pubkey[1] - signatures[1]
+        >>> RSAsig.verify_batch(pubkey, messages, signatures), RSAsig.verify(pubkey, messages[0], signatures[0])
+        ([True, True, True, True, True], False)
+        """
+        if len(messages) != len(signatures):
+            raise ValueError("there must be one signature for every message")
+        e, n = pubkey
+        n = gm.mpz(n)
+        hashes = [gm.mpz(int(sha256(message).hexdigest(), 16)) for message in messages]
+        signatures = [gm.mpz(signature) % n for signature in signatures]
+        results = [False] * len(messages)
+
+        def screen(start, end):
+            if end - start == 1:
+                results[start] = gm.powmod(signatures[start], e, n) == hashes[start]
+                return
+            signature_product = gm.mpz(1)
+            hash_product = gm.mpz(1)
+            for i in range(start, end):
+                signature_product = signature_product * signatures[i] % n
+                hash_product = hash_product * hashes[i] % n
+            if gm.powmod(signature_product, e, n) == hash_product:
+                results[start:end] = [True] * (end - start)
+            else:
+                middle = (start + end) // 2
+                screen(start, middle)
+                screen(middle, end)
+
+        if messages:
+            screen(0, len(messages))
+        return results
+
+
+def _generate_key_primes(size, prime_count):
+    return RSAsig.keygen(size, workers=1, prime_count=prime_count)[2]
+
+
+def _keypair_from_primes(primes, e=65537):
+    privkey = RSAPrivateKey(primes[0], primes[1], e, other_primes=primes[2:])
+    return (e, int(privkey.n)), privkey, tuple(primes)
+
+
+class RSAKeyPool(RefillPool):
+    """A pool of pre-generated RSA keypairs, like they are returned by :func:`RSAsig.keygen`.
+    Whenever fewer than *low* keypairs are left, *workers* background processes generate new ones
+    until there are *high* of them. get() returns a keypair at once, and only generates one
+    synchronously if the pool is empty.
+
+    If a *spool* directory is given, every pre-generated key is also written there (readable only
+    by the owner), so that the keys survive a restart of the program. A key file is deleted before
+    its key is handed out. A spool directory must not be shared by several pools.
+
+    >>> pool = RSAKeyPool(512, low=1, high=2, workers=1)
+    >>> (pubkey, privkey, primes) = pool.get()
+    >>> message = str.encode("Star wars is awesome")
+    >>> RSAsig.verify(pubkey, message, RSAsig.sign(privkey, message))
+    True
+    >>> pool.stop()
+    """
+    def __init__(self, size=1024, prime_count=2, low=4, high=16, workers=None, spool=None, start=True):
+        self.size = size
+        self.prime_count = prime_count
+        self.workers = workers
+        self.spool = spool
+        self._executor = None
+        super().__init__(low, high, start=False, name="RSAKeyPool-{:d}".format(size))
+        if spool is not None:
+            self._load_spool()
+        if start:
+            self.start()
+
+    def start(self):
+        with self._condition:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        super().start()
+
+    def _after_fork(self):
+        super()._after_fork()
+        self._executor = None  # the worker processes belong to the parent
+
+    def _cancel(self):
+        with self._condition:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _generate(self, count):
+        executor = self._executor
+        try:
+            futures = [executor.submit(_generate_key_primes, self.size, self.prime_count) for _ in range(count)]
+        except (AttributeError, RuntimeError):
+            return  # the pool was stopped in the meantime
+        try:
+            for future in as_completed(futures):
+                yield _keypair_from_primes(future.result())
+        except CancelledError:
+            return
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _generate_now(self):
+        return RSAsig.keygen(self.size, prime_count=self.prime_count)
+
+    def _load_spool(self):
+        os.makedirs(self.spool, mode=0o700, exist_ok=True)
+        for name in sorted(os.listdir(self.spool)):
+            path = os.path.join(self.spool, name)
+            if name.endswith(".tmp"):
+                os.unlink(path)  # left over from an interrupted write
+            elif name.endswith(".key"):
+                with open(path) as spooled:
+                    key = json.load(spooled)
+                if key["size"] == self.size and len(key["primes"]) == self.prime_count:
+                    self._items.append(path)
+
+    def _store(self, keypair):
+        if self.spool is None:
+            return keypair
+        pubkey, _, primes = keypair
+        key = {"size": self.size, "e": pubkey[0], "primes": [format(int(prime), "x") for prime in primes]}
+        path = os.path.join(self.spool, "{:020d}-{}.key".format(time.time_ns(), token_hex(4)))
+        descriptor = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "w") as spooled:
+            json.dump(key, spooled)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def _retrieve(self, stored):
+        if self.spool is None:
+            return stored
+        with open(stored) as spooled:
+            key = json.load(spooled)
+        os.unlink(stored)
+        return _keypair_from_primes([int(prime, 16) for prime in key["primes"]], key["e"])
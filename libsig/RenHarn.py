@@ -1,21 +1,268 @@
-from gmpy2 import invert, gcd
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from gmpy2 import invert, gcd, legendre, is_strong_bpsw_prp
 from hashlib import sha256
 
-from libsig.primes import gen_prime, is_safe_prime
-from libsig.secrets import randrange
+from libsig.arithmetic import multi_pow
+from libsig.pool import RefillPool
+from libsig.primes import gen_safe_prime, get_group
+from libsig.secrets import randbelow, randrange, randrange_many
 from libsig.AbstractSignatureScheme import AbstractSignatureScheme
 from libsig.AbstractRingSignatureScheme import AbstractRingSignatureScheme
 
 
+BATCH_SOUNDNESS = 64
+"""The default soundness parameter of the batch checks in bits, see :func:`member_equations_hold`."""
+
+
+def member_equations_hold(g, p, equations, soundness=BATCH_SOUNDNESS):
+    """
+    Check the ElGamal equations :math:`g^{m_i} = e_i^{\\alpha_i} \\alpha_i^{\\beta_i} \\pmod{p}` for a safe prime p.
+
+    Instead of three exponentiations per equation, random exponents r_i of *soundness* bits combine them into
+    :math:`g^{\\sum r_i m_i} = \\prod e_i^{r_i \\alpha_i} \\alpha_i^{r_i \\beta_i}`, with a single power of g and
+    a multi-exponentiation of the rest, see :func:`libsig.arithmetic.multi_pow`. In the subgroup of order (p-1)/2
+    a wrong equation passes with a probability of at most 2^-soundness. Random exponents can't detect an error of
+    order 2, so the quadratic characters of both sides of every equation are compared on their own,
+    which costs two Legendre symbols per equation. For a p which is not a safe prime, Z_p* may have other small
+    subgroups, and every equation is checked on its own.
+
+    >>> p, g = 1019, 2
+    >>> d, l = 5, 7
+    >>> e, alpha = pow(g, d, p), pow(g, l, p)
+    >>> beta = 3
+    >>> m = (d * alpha + l * beta) % (p - 1)
+    >>> member_equations_hold(g, p, [(e, m, alpha, beta)] * 3), member_equations_hold(g, p, [(e, m + 1, alpha, beta)])
+    (True, False)
+
+    :param g: The generator
+    :param p: The safe prime
+    :param equations: The (e_i, m_i, alpha_i, beta_i) of the equations
+    :param soundness: The bits of the random exponents, None checks every equation on its own
+    :return: True iff all equations hold, except with a probability of at most 2^-soundness
+    """
+    if soundness is not None and not _is_safe_prime(p):
+        soundness = None
+    single = equations if soundness is None else [(e, m, alpha, beta) for e, m, alpha, beta in equations
+                                                  if e % p == 0 or alpha % p == 0]
+    for e, m, alpha, beta in single:
+        if pow(g, m, p) != (pow(e, alpha, p) * pow(alpha, beta, p)) % p:
+            return False
+    if soundness is None:
+        return True
+    # alpha is the exponent of e_i as given, and only reduced as a base, like in the single check
+    batch = [(e % p, m, alpha, beta) for e, m, alpha, beta in equations if e % p != 0 and alpha % p != 0]
+    if not batch:
+        return True
+
+    # the component of order 2: (-1)^m_i (g) must match (-1)^alpha_i (e_i) * (-1)^beta_i (alpha_i)
+    nonResidueG = legendre(g, p) == -1
+    for e, m, alpha, beta in batch:
+        if (nonResidueG and m % 2) != ((legendre(e, p) == -1 and alpha % 2) != (legendre(alpha, p) == -1 and beta % 2)):
+            return False
+
+    order = p - 1
+    r = randrange_many(1, 1 << soundness, len(batch))
+    left = pow(g, sum(r_i * m for r_i, (_, m, _, _) in zip(r, batch)) % order, p)
+    # a base occurring in several equations, like the key of many signatures, is raised only once
+    exponents = {}
+    for r_i, (e, _, alpha, beta) in zip(r, batch):
+        exponents[e] = (exponents.get(e, 0) + r_i * alpha) % order
+        exponents[alpha % p] = (exponents.get(alpha % p, 0) + r_i * beta) % order
+    return left == multi_pow(list(exponents), list(exponents.values()), p)
+
+
+class SelfCheckPolicy:
+    """
+    Decides which new signatures :func:`RenHarn.ringsign` verifies before returning them:
+    every signature with rate 1, none with rate 0, and a random sample of that share otherwise.
+    A signature failing the check, e.g. because of a fault in the computation, is not returned,
+    a RuntimeError is raised instead. The counters tell how often that happened.
+
+    >>> policy = SelfCheckPolicy(0.25)
+    >>> samples = [policy.should_check() for _ in range(4000)]
+    >>> 800 < sum(samples) < 1200, policy.signatures, policy.checks == sum(samples), policy.failures
+    (True, 4000, True, 0)
+
+    :param rate: The share of the signatures to check, between 0 and 1
+    :param soundness: The soundness of the check, see :func:`member_equations_hold`
+    """
+    _PRECISION = 1 << 53
+
+    def __init__(self, rate=1.0, soundness=BATCH_SOUNDNESS):
+        if not 0 <= rate <= 1:
+            raise ValueError("the rate must be between 0 and 1")
+        self.rate = rate
+        self.soundness = soundness
+        self.signatures = 0  # signatures seen by the policy
+        self.checks = 0  # signatures that were checked
+        self.failures = 0  # signatures that failed the check
+        self._lock = threading.Lock()
+
+    def should_check(self):
+        """
+        :return: True if the next signature is to be checked
+        """
+        check = self.rate >= 1 or randbelow(self._PRECISION) < self.rate * self._PRECISION
+        with self._lock:
+            self.signatures += 1
+            self.checks += check
+        return check
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+
+def _chain_hash(message, p, transcript="str"):
+    """
+    The hash function of the chain of a ring signature, mapping a value below p to the next one.
+    The message is hashed only once, and the hash state is copied for every value,
+    so that a member costs the same for every size of the message.
+
+    "str" hashes str(message) + str(value) like earlier versions,
+    "binary" hashes the message with a domain separating prefix, followed by the value as big-endian bytes
+    with the width of p, which avoids the decimal formatting of the values.
+    """
+    if transcript == "str":
+        state = sha256(str(message).encode())
+        encode = lambda value: str(value).encode()
+    elif transcript == "binary":
+        if not isinstance(message, (bytes, bytearray, memoryview)):
+            # bytes(3) would be b"\0\0\0"
+            raise TypeError("The message must be bytes with the binary transcript.")
+        state = sha256(b"RenHarn-chain" + len(message).to_bytes(8, "big") + bytes(message))
+        width = (int(p).bit_length() + 7) // 8
+        encode = lambda value: int(value).to_bytes(width, "big")
+    else:
+        raise ValueError("Unknown transcript {}, use 'str' or 'binary'.".format(transcript))
+
+    def h(value):
+        step = state.copy()
+        step.update(encode(value))
+        return int.from_bytes(step.digest(), "big")
+
+    return h
+
+
+def _simulate_member(g, p, e_i, randomness):
+    """
+    :return: (m_i, alpha_i, beta_i) of a ring member with the public key e_i, see :func:`member_randomness`
+    """
+    (a_i, b_i, b_i_inverse, g_a_i) = randomness
+    alpha_i = (g_a_i * pow(e_i, b_i, p)) % p
+    beta_i = (- alpha_i * b_i_inverse) % (p - 1)
+    m_i = (a_i * beta_i) % (p - 1)
+    return m_i, alpha_i, beta_i
+
+
+_worker_ring = None
+
+
+def _init_ring_worker(g, p, keys):
+    global _worker_ring
+    _worker_ring = (g, p, keys)
+
+
+def _simulate_members(start, end):
+    g, p, keys = _worker_ring
+    return [_simulate_member(g, p, keys[i], member_randomness(g, p)) for i in range(start, end)]
+
+
+def _check_members(start, members, soundness):
+    g, p, keys = _worker_ring
+    equations = [(keys[start + j], m_i, alpha_i, beta_i) for j, (m_i, alpha_i, beta_i) in enumerate(members)]
+    return member_equations_hold(g, p, equations, soundness)
+
+
+class _RingExecutor:
+    """A process pool for a ring, with the number of calls using it, so that it is only shut down when unused."""
+
+    def __init__(self, g, p, keys, workers):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_ring_worker, initargs=(g, p, keys))
+        self.users = 0
+        self.evicted = False
+
+
+_RING_EXECUTORS = 4
+"""The number of rings whose process pools are kept, see :func:`_executor`."""
+
+_ring_executors = OrderedDict()
+_ring_executors_lock = threading.Lock()
+
+
+def _forget_ring_executors():
+    # the worker processes belong to the parent
+    global _ring_executors_lock
+    _ring_executors.clear()
+    _ring_executors_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_ring_executors)
+
+
+def _evict(entry):
+    """Shut the pool down, at once if no call uses it, else when the last one is done. Call with the lock held."""
+    entry.evicted = True
+    return entry if entry.users == 0 else None
+
+
+@contextmanager
+def _executor(g, p, keys, workers):
+    """
+    The process pool for the ring, whose workers get (g, p) and the keys once when they start.
+    The pools of the last few rings are kept for the next signatures, and a pool is never shut down
+    while another thread is using it.
+    """
+    key = (g, p, tuple(keys), workers)
+    closing = []
+    with _ring_executors_lock:
+        entry = _ring_executors.pop(key, None) or _RingExecutor(g, p, keys, workers)
+        _ring_executors[key] = entry
+        entry.users += 1
+        while len(_ring_executors) > _RING_EXECUTORS:
+            closing.append(_evict(_ring_executors.popitem(last=False)[1]))
+    for old in filter(None, closing):
+        old.executor.shutdown(wait=False)
+    try:
+        yield entry.executor
+    finally:
+        with _ring_executors_lock:
+            entry.users -= 1
+            close = entry.evicted and entry.users == 0
+        if close:
+            entry.executor.shutdown(wait=False)
+
+
+def _chunks(start, end, workers):
+    size = max(1, -(-(end - start) // (4 * workers)))
+    return [(i, min(i + size, end)) for i in range(start, end, size)]
+
+
+def _default_workers(workers):
+    if workers is None:
+        return os.cpu_count() or 1
+    return workers
+
+
 class RenHarn(AbstractRingSignatureScheme):
     """
     Implements the "Ring Signature Based on ElGamal Signature" by Jian Ren and Lein Harn
     """
+    self_check = SelfCheckPolicy(1.0)
+    """The :class:`SelfCheckPolicy` used by :func:`ringsign` by default, which checks every signature."""
+
     @staticmethod
     def keygen(size=1024, g=None, p=None):
         """
         Generate a new (public, private)-key-pair.
-        If a generator and a prime are supplied, they are used for the key-generation
+        If a generator and a prime are supplied, they are used for the key-generation,
+        otherwise the standard group of the size is used, see :func:`ElGamal.keygen`.
 
         :param size: The security parameter, larger is better. Recommended is at least 512
         :type size: integer or None
@@ -33,7 +280,7 @@ class RenHarn(AbstractRingSignatureScheme):
             return (e, g, p), (d, g, p)
 
     @staticmethod
-    def ringsign(privkey, pubkeys, message):
+    def ringsign(privkey, pubkeys, message, transcript="str", randomness_pool=False, self_check=None, workers=1):
         """
         Creates a ringsignature for the supplied message
 
@@ -43,104 +290,333 @@ class RenHarn(AbstractRingSignatureScheme):
         :type pubkeys: [(key: integer, g: integer, p: integer)]
         :param message: The message to be signed
         :type message: valid utf-8 bytes
+        :param transcript: The encoding of the hash chain, "str" like earlier versions or the faster "binary",
+                           the signature must be verified with the same transcript
+        :type transcript: string
+        :param randomness_pool: take the random values of the members and the signer, with their powers of g,
+                                from the shared :class:`RandomnessPool` of the group, instead of computing them
+        :type randomness_pool: bool
+        :param self_check: The policy for verifying the ElGamal equations of the signature before returning it,
+                           :attr:`RenHarn.self_check` by default
+        :type self_check: SelfCheckPolicy or None
+        :param workers: The number of processes simulating the members and checking the equations,
+                        one per cpu for None. With more than one, the members don't use the randomness pool
+        :type workers: integer or None
         :return: The signature for the message
         """
         assert all(map(lambda x: x[1] == privkey[1] and x[2] == privkey[2], pubkeys))
         (d, g, p) = privkey
-        h = lambda m: int(sha256(m).hexdigest(), 16)
-        k = h(message)
-        message = str(message)
+        h = _chain_hash(message, p, transcript)
         v = randrange(1, p)
-        messages = []
+        messages = [(0, None, None)]
         n = len(pubkeys)
-        for i in range(n):
-            e_i = pubkeys[i][0]
-            a_i = randrange(1, p - 1)
-            while 1:
-                b_i = randrange(1, p - 1)
-                if gcd(b_i, p - 1) == 1:
-                    break
-            alpha_i = (pow(g, a_i, p) * pow(e_i, b_i, p)) % p
-            beta_i = (- alpha_i * invert(b_i, p - 1)) % (p - 1)
-            m_i = (a_i * beta_i) % (p - 1)
-            messages.append((m_i, alpha_i, beta_i))
-        messages[0] = (0, None, None)
+        workers = _default_workers(workers)
+        if workers > 1:
+            with _executor(g, p, [pubkey[0] for pubkey in pubkeys], workers) as executor:
+                for members in executor.map(_simulate_members, *zip(*_chunks(1, n, workers))):
+                    messages.extend(members)
+        else:
+            if randomness_pool:
+                pool = get_randomness_pool(g, p, "member")
+                members = [pool.get() for _ in range(1, n)]
+            else:
+                members = [member_randomness(g, p) for _ in range(1, n)]
+            for i in range(1, n):
+                messages.append(_simulate_member(g, p, pubkeys[i][0], members[i - 1]))
         v_i_s = [None]*n
-        v_i_s[1] = h(str.encode(message + str(v)))
+        v_i_s[1] = h(v)
         for i in [(x % n) for x in range(2, n+1)]:
             tmp = (v_i_s[i - 1] + messages[i - 1][0]) % p
-            v_i_s[i] = h(str.encode(message + str(tmp)))
+            v_i_s[i] = h(tmp)
         messages[0] = (v - v_i_s[0], None, None)
-        while 1:
-            l = randrange(2, p)
-            if gcd(l, p - 1) == 1:
-                break
-        alpha_s = pow(g, l, p)
-        beta_s = ((messages[0][0] - d * alpha_s) * invert(l, p - 1)) % (p - 1)
+        if randomness_pool:
+            (l, alpha_s, l_inverse) = get_randomness_pool(g, p, "sign").get()
+        else:
+            (l, alpha_s, l_inverse) = sign_randomness(g, p)
+        beta_s = ((messages[0][0] - d * alpha_s) * l_inverse) % (p - 1)
         messages[0] = (messages[0][0], alpha_s, beta_s)
-        for i in range(n):
-            assert pow(g, messages[i][0], p) == (pow(pubkeys[i][0], messages[i][1], p) * pow(messages[i][1], messages[i][2], p)) % p
+        policy = RenHarn.self_check if self_check is None else self_check
+        if policy.should_check():
+            if not RenHarn._members_hold(pubkeys, messages, policy.soundness, workers):
+                policy.record_failure()
+                raise RuntimeError("the ring signature failed its self-check")
         z = randrange(0, n)
         return z, v_i_s[z], messages
 
     @staticmethod
-    def verify(pubkeys, message, sig):
+    def verify(pubkeys, message, sig, soundness=BATCH_SOUNDNESS, transcript="str", workers=1):
         """
         Verifies a signature
 
+        The ElGamal equations of the members are checked together, see :func:`member_equations_hold`.
+
         :param pubkeys: An array with the public key tuples of all members of the ring
         :type pubkeys: [(key: integer, g: integer, p: integer)]
         :param message: The message that was signed
         :type message: valid utf-8 bytes
         :param sig: The signature generated by :func:`ringsign`
+        :param soundness: The batch check accepts a wrong equation with a probability of at most 2^-soundness,
+                          None checks every equation on its own
+        :type soundness: integer or None
+        :param transcript: The encoding of the hash chain used for signing, "str" or "binary"
+        :type transcript: string
+        :param workers: The number of processes checking the equations, one per cpu for None
+        :type workers: integer or None
         :return: True iff sig is a valid signature for the message
         """
+        if not RenHarn._chain_holds(pubkeys, message, sig, transcript):
+            return False
+        return RenHarn._members_hold(pubkeys, sig[2], soundness, _default_workers(workers))
+
+    @staticmethod
+    def _members_hold(pubkeys, ms, soundness, workers):
+        """
+        Checks the ElGamal equations of the members, in chunks spread over a process pool for workers > 1
+        """
+        (_, g, p) = pubkeys[0]
+        if workers <= 1:
+            return member_equations_hold(g, p, RenHarn._equations(pubkeys, (None, None, ms)), soundness)
+        chunks = _chunks(0, len(ms), workers)
+        with _executor(g, p, [pubkey[0] for pubkey in pubkeys], workers) as executor:
+            return all(executor.map(_check_members, [start for start, _ in chunks],
+                                    [ms[start:end] for start, end in chunks], [soundness] * len(chunks)))
+
+    @staticmethod
+    def shutdown():
+        """
+        Stops the process pools of :func:`ringsign` and :func:`verify` with workers.
+        A pool still in use by another thread is stopped when that call is done.
+        """
+        with _ring_executors_lock:
+            closing = [_evict(entry) for entry in _ring_executors.values()]
+            _ring_executors.clear()
+        for entry in filter(None, closing):
+            entry.executor.shutdown()
+
+    @staticmethod
+    def verify_batch(rings, messages, sigs, soundness=BATCH_SOUNDNESS, transcript="str"):
+        """
+        Verifies many signatures, whose rings share g and p, with one batch check of all their ElGamal equations.
+        Only if the batch check fails, the signatures are checked one by one.
+
+        :param rings: The public keys of the ring of every signature, see :func:`verify`
+        :param messages: The messages that were signed
+        :param sigs: The signatures generated by :func:`ringsign`
+        :param soundness: The probability of accepting a wrong equation is at most 2^-soundness
+        :type soundness: integer
+        :param transcript: The encoding of the hash chain used for signing, "str" or "binary"
+        :type transcript: string
+        :return: A list with True for every valid signature and False for the others
+        """
+        if not len(rings) == len(messages) == len(sigs):
+            raise ValueError("rings, messages and signatures don't have the same size")
+        results = [RenHarn._chain_holds(pubkeys, message, sig, transcript)
+                   for pubkeys, message, sig in zip(rings, messages, sigs)]
+        groups = {}
+        for index, pubkeys in enumerate(rings):
+            if results[index]:
+                groups.setdefault((pubkeys[0][1], pubkeys[0][2]), []).append(index)
+        for (g, p), indices in groups.items():
+            equations = [RenHarn._equations(rings[index], sigs[index]) for index in indices]
+            if member_equations_hold(g, p, [equation for member in equations for equation in member], soundness):
+                continue
+            for index, member in zip(indices, equations):
+                results[index] = member_equations_hold(g, p, member, soundness)
+        return results
+
+    @staticmethod
+    def _chain_holds(pubkeys, message, sig, transcript="str"):
+        """
+        Checks that the ring shares g and p and that the hash chain of the signature closes,
+        which is cheap compared to the ElGamal equations
+        """
         if any(map(lambda x: x[1] != pubkeys[0][1] or x[2] != pubkeys[0][2], pubkeys)):
             return False
         (_, g, p) = pubkeys[0]
         (i_0, v_i_0, ms) = sig
-        message = str(message)
         assert len(pubkeys) == len(ms)
         n = len(pubkeys)
-        for i in range(n):
-            if pow(g, ms[i][0], p) != (pow(pubkeys[i][0], ms[i][1], p) * pow(ms[i][1], ms[i][2], p)) % p:
-                return False
-        h = lambda m: int(sha256(m).hexdigest(), 16)
-        v = h(str.encode(message + str((ms[i_0][0] + v_i_0) % p)))
+        h = _chain_hash(message, p, transcript)
+        v = h((ms[i_0][0] + v_i_0) % p)
         for i in range(1, n):
-            v = h(str.encode(message + str((ms[(i + i_0) % n][0] + v) % p)))
+            v = h((ms[(i + i_0) % n][0] + v) % p)
         return v == v_i_0
 
+    @staticmethod
+    def _equations(pubkeys, sig):
+        """
+        :return: the (e_i, m_i, alpha_i, beta_i) of the ElGamal equations of the members
+        """
+        return [(pubkey[0], m_i, alpha_i, beta_i) for pubkey, (m_i, alpha_i, beta_i) in zip(pubkeys, sig[2])]
+
+
+def _is_generator(g, p):
+    """
+    Check that g generates the whole group Z/pZ for a safe prime p, and that neither g nor its inverse divide p-1.
+    """
+    q = p // 2
+    if pow(g, 2, p) == 1:
+        return False
+    if pow(g, q, p) == 1:
+        return False
+    if divmod(p - 1, g)[1] == 0:
+        return False
+    if divmod(p - 1, invert(g, p))[1] == 0:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _standard_generator(name):
+    """
+    The smallest suitable generator of a standard group, so that all keys in the group agree on it.
+    """
+    p = get_group(name).p
+    g = 3
+    while not _is_generator(g, p):
+        g += 1
+    return g
+
+
+@lru_cache(maxsize=16)
+def _is_safe_prime(p):
+    return is_strong_bpsw_prp(p // 2)
+
+
+def random_unit(p, low=1):
+    """
+    A uniformly random l >= low with gcd(l, p - 1) = 1.
+    For a safe prime p = 2q + 1, the units modulo p - 1 are the odd numbers except q,
+    so l is sampled directly instead of drawing numbers until one is coprime.
+
+    >>> p = 1019
+    >>> units = {random_unit(p) for _ in range(3000)}
+    >>> all(gcd(l, p - 1) == 1 for l in units), len(units) > 400, min(random_unit(p, 2) for _ in range(500)) >= 3
+    (True, True, True)
+    """
+    if not _is_safe_prime(p):
+        while 1:
+            l = randrange(low, p - 1)
+            if gcd(l, p - 1) == 1:
+                return l
+    q = p // 2
+    # the odd numbers 1, 3, ..., p - 2 without q, of which the ones below low are skipped
+    skipped = low // 2
+    l = 2 * randrange(skipped, q - 1) + 1
+    if l >= q:
+        l += 2
+    return l
+
+
+def sign_randomness(g, p):
+    """
+    The part of an ElGamal signature that does not depend on the message.
+
+    :return: (l, g^l mod p, l^-1 mod p-1) for a random unit l
+    """
+    l = random_unit(p, 2)
+    return l, pow(g, l, p), invert(l, p - 1)
+
+
+def member_randomness(g, p):
+    """
+    The part of the simulated signature of a ring member in :func:`RenHarn.ringsign`
+    that does not depend on the public key of the member.
+
+    :return: (a, b, b^-1 mod p-1, g^a mod p) for a random a and a random unit b
+    """
+    a = randrange(1, p - 1)
+    b = random_unit(p)
+    return a, b, invert(b, p - 1), pow(g, a, p)
+
+
+class RandomnessPool(RefillPool):
+    """
+    A stock of :func:`sign_randomness` or :func:`member_randomness` tuples for the group (g, p),
+    kept filled by a background thread, see :class:`libsig.pool.RefillPool`.
+    Every tuple is handed out only once, and a forked child process starts with an empty pool,
+    as a nonce l used for two signatures reveals the private key.
+
+    >>> pool = RandomnessPool(2, 1019, "sign", low=1, high=3)
+    >>> l, g_l, l_inverse = pool.get()
+    >>> g_l == pow(2, l, 1019), l * l_inverse % 1018
+    (True, mpz(1))
+    >>> pool.stop()
+    """
+    KINDS = {"sign": sign_randomness, "member": member_randomness}
+
+    def __init__(self, g, p, kind="sign", low=4, high=16, start=True):
+        if kind not in self.KINDS:
+            raise ValueError("unknown kind {}, use 'sign' or 'member'".format(kind))
+        self.g = g
+        self.p = p
+        self.kind = kind
+        super().__init__(low, high, start, name="RandomnessPool-{}".format(kind))
+
+    def _generate(self, count):
+        for _ in range(count):
+            yield self._generate_now()
+
+    def _generate_now(self):
+        return self.KINDS[self.kind](self.g, self.p)
+
+
+_randomness_pools = {}
+_randomness_pools_lock = threading.Lock()
+
+
+def get_randomness_pool(g, p, kind="sign", **kwargs):
+    """
+    The shared :class:`RandomnessPool` of the group for the kind of tuples, created on first use.
+    The keyword arguments are passed to the constructor of a new pool and ignored otherwise,
+    e.g. high should be about the size of the rings for "member".
+    """
+    with _randomness_pools_lock:
+        key = (g, p, kind)
+        if key not in _randomness_pools:
+            _randomness_pools[key] = RandomnessPool(g, p, kind, **kwargs)
+        return _randomness_pools[key]
+
 
 class ElGamal(AbstractSignatureScheme):
     @staticmethod
-    def keygen(size=1024):
+    def keygen(size=1024, workers=None, group=None, fresh=False):
         """
         Generate a new (public, private)-key-pair.
+        By default the standard safe prime group with a prime of the given size is used,
+        see :func:`libsig.primes.get_group`, so that all keys of that size share (g, p).
+        A new safe prime is only generated if there is no such group or if fresh is set.
 
         :param size: The security parameter, larger is better. Recommended is at least 512
         :type size: integer or None
+        :param workers: The number of processes searching for the safe prime, one per cpu by default
+        :type workers: integer or None
+        :param group: The name of a standard safe prime group to use instead of the size
+        :type group: string or None
+        :param fresh: Generate a new safe prime even if there is a standard group
+        :type fresh: bool
         :return: A tuple consisting of the pubkey = (key, g, p) and the privkey = (key, g, p)
         """
-        p = gen_prime(size, extra_check=is_safe_prime)
-        q = p // 2
-        while 1:
-            g = randrange(3, p)
-            if pow(g, 2, p) == 1:
-                continue
-            if pow(g, q, p) == 1:
-                continue
-            if divmod(p - 1, g)[1] == 0:
-                continue
-            if divmod(p - 1, invert(g, p))[1] == 0:
-                continue
-            break
+        if group is None and not fresh:
+            try:
+                group = get_group(size).name
+            except ValueError:
+                pass
+        if group is not None:
+            p = get_group(group).p
+            g = _standard_generator(group)
+        else:
+            p = gen_safe_prime(size, workers=workers)
+            while 1:
+                g = randrange(3, p)
+                if _is_generator(g, p):
+                    break
         d = randrange(2, p - 1)
         e = pow(g, d, p)
         return (e, g, p), (d, g, p)
 
     @staticmethod
-    def sign(privkey, message):
+    def sign(privkey, message, randomness_pool=False):
         """
         Creates a signature for the supplied message
 
@@ -148,15 +624,18 @@ class ElGamal(AbstractSignatureScheme):
         :type privkey: (key: integer, g: integer, p: integer)
         :param message: The message to be signed
         :type message: valid utf-8 bytes
+        :param randomness_pool: take l, g^l and l^-1 from the shared :class:`RandomnessPool` of the group,
+                                so that only a few multiplications are left to do
+        :type randomness_pool: bool
         :return: The signature for the message
         """
         (d, g, p) = privkey
         m = int(sha256(message).hexdigest(), 16)
-        l = randrange(2, p - 1)
-        while gcd(l, p - 1) != 1:
-            l = randrange(2, p - 1)
-        alpha = pow(g, l, p)
-        beta = ((m - d * alpha) * invert(l, p - 1)) % (p - 1)
+        if randomness_pool:
+            (l, alpha, l_inverse) = get_randomness_pool(g, p, "sign").get()
+        else:
+            (l, alpha, l_inverse) = sign_randomness(g, p)
+        beta = ((m - d * alpha) * l_inverse) % (p - 1)
         return alpha, beta
 
     @staticmethod
@@ -177,3 +656,47 @@ class ElGamal(AbstractSignatureScheme):
             return False
         m = int(sha256(message).hexdigest(), 16)
         return pow(g, m, p) == (pow(e, alpha, p) * pow(alpha, beta, p)) % p
+
+    @staticmethod
+    def verify_batch(pubkey, messages, signatures, soundness=BATCH_SOUNDNESS):
+        """
+        Verifies many signatures of one key.
+        All equations are checked at once with random exponents, see :func:`member_equations_hold`,
+        where the powers of g and of the key are combined into a single one each, and the powers of the alphas
+        share the squarings of a multi-exponentiation. Only if that fails, the batch is bisected
+        to find the invalid signatures.
+
+        >>> (pubkey, privkey) = ElGamal.keygen(512)
+        >>> messages = [str(i).encode() for i in range(5)]
+        >>> signatures = [ElGamal.sign(privkey, message) for message in messages]
+        >>> signatures[3] = (signatures[3][0], signatures[3][1] + 1)
+        >>> ElGamal.verify_batch(pubkey, messages, signatures)
+        [True, True, True, False, True]
+
+        :param pubkey: The public key tuple of the signer
+        :type pubkey: (key: integer, g: integer, p: integer)
+        :param messages: The messages that were signed
+        :param signatures: The signatures generated by :func:`sign`
+        :param soundness: The probability of accepting an invalid signature is at most 2^-soundness
+        :type soundness: integer
+        :return: A list with True for every valid signature and False for the others
+        """
+        if len(messages) != len(signatures):
+            raise ValueError("there must be one signature for every message")
+        (e, g, p) = pubkey
+        equations = [(e, int(sha256(message).hexdigest(), 16), alpha, beta)
+                     for message, (alpha, beta) in zip(messages, signatures)]
+        results = [1 <= alpha < p for alpha, _ in signatures]
+
+        def screen(indices):
+            if len(indices) == 1:
+                results[indices[0]] = member_equations_hold(g, p, [equations[indices[0]]], None)
+            elif not member_equations_hold(g, p, [equations[i] for i in indices], soundness):
+                middle = len(indices) // 2
+                screen(indices[:middle])
+                screen(indices[middle:])
+
+        candidates = [i for i, result in enumerate(results) if result]
+        if candidates:
+            screen(candidates)
+        return results
@@ -0,0 +1,136 @@
+"""
+Modular arithmetic shared by the schemes.
+"""
+from gmpy2 import mpz
+
+
+def window_table(base, modulus, window=5):
+    """
+    The powers :math:`base^0, \\dots, base^{2^{window}-1} \\pmod{modulus}`, as used by :func:`multi_pow_tables`.
+    For a base that occurs in many products, the table only needs to be computed once.
+
+    :param base: the base
+    :param modulus: the modulus
+    :param window: the number of exponent bits processed at once
+    :return: the table
+    """
+    base = mpz(base) % modulus
+    table = [mpz(1), base]
+    for _ in range(2, 1 << window):
+        table.append(table[-1] * base % modulus)
+    return table
+
+
+def multi_pow_tables(tables, exponents, modulus, window=5):
+    """
+    :math:`\\prod_i base_i^{exponent_i} \\pmod{modulus}` for the bases of the tables made by :func:`window_table`,
+    by Straus' interleaving: the exponents are cut into windows of *window* bits, and all products share the
+    squarings, so the whole product costs about as many squarings as a single exponentiation.
+
+    :param tables: the window tables of the bases, with the same window
+    :param exponents: the non-negative exponents
+    :param modulus: the modulus
+    :param window: the window of the tables
+    :return: the product
+    """
+    if len(tables) != len(exponents):
+        raise ValueError("tables and exponents don't have the same size")
+    mask = (1 << window) - 1
+    windows = (max([int(exponent).bit_length() for exponent in exponents] + [0]) + window - 1) // window
+    digits = []
+    for exponent in exponents:
+        exponent = int(exponent)
+        if exponent < 0:
+            raise ValueError("negative exponents are not supported")
+        digits.append([(exponent >> shift) & mask for shift in range((windows - 1) * window, -1, -window)])
+    squarings = range(window)
+    result = mpz(1)
+    for position in range(windows):
+        if position:
+            for _ in squarings:
+                result = result * result % modulus
+        for table, digit in zip(tables, digits):
+            if digit[position]:
+                result = result * table[digit[position]] % modulus
+    return result % modulus
+
+
+def multi_pow(bases, exponents, modulus, window=5):
+    """
+    :math:`\\prod_i base_i^{exponent_i} \\pmod{modulus}` by Straus' interleaving, see :func:`multi_pow_tables`.
+
+    >>> multi_pow([2, 3, 5], [10, 20, 30], 1000003) == (2**10 * 3**20 * 5**30) % 1000003
+    True
+    >>> multi_pow([7, 11], [2**200 + 1, 12345], 2**127 - 1, window=3) == pow(7, 2**200 + 1, 2**127 - 1) * pow(11, 12345, 2**127 - 1) % (2**127 - 1)
+    True
+
+    :param bases: the bases
+    :param exponents: the non-negative exponents
+    :param modulus: the modulus
+    :param window: the number of exponent bits processed at once, larger windows need larger tables
+    :return: the product
+    """
+    if len(bases) != len(exponents):
+        raise ValueError("bases and exponents don't have the same size")
+    modulus = mpz(modulus)
+    return multi_pow_tables([window_table(base, modulus, window) for base in bases], exponents, modulus, window)
+
+
+class FixedBase:
+    """
+    Precomputed powers of a base which is raised to many different exponents.
+    For every window j of the exponent and every digit d, :math:`base^{d 2^{window \\cdot j}}` is stored,
+    so that an exponentiation needs one multiplication per window and no squarings at all.
+    The table holds :math:`2^{window}` numbers per window, and only pays off for many exponentiations.
+
+    >>> fixed = FixedBase(3, 1000003, 64, window=4)
+    >>> fixed.pow(2**63 + 12345) == pow(3, 2**63 + 12345, 1000003)
+    True
+
+    :param base: the base
+    :param modulus: the modulus
+    :param exponent_bits: the maximal bit length of the exponents, larger ones fall back to pow()
+    :param window: the number of exponent bits per window
+    """
+
+    def __init__(self, base, modulus, exponent_bits, window=6):
+        self.base = mpz(base) % modulus
+        self.modulus = mpz(modulus)
+        self.window = window
+        self.exponent_bits = exponent_bits
+        self._rows = []
+        power = self.base
+        for _ in range((exponent_bits + window - 1) // window):
+            row = window_table(power, self.modulus, window)
+            self._rows.append(row)
+            power = row[-1] * power % self.modulus
+
+    def pow(self, exponent):
+        """
+        :return: :math:`base^{exponent} \\pmod{modulus}`
+        """
+        exponent = int(exponent)
+        if exponent < 0 or exponent.bit_length() > self.exponent_bits:
+            return pow(self.base, exponent, self.modulus)
+        mask = (1 << self.window) - 1
+        modulus = self.modulus
+        result = mpz(1)
+        for row in self._rows:
+            digit = exponent & mask
+            if digit:
+                result = result * row[digit] % modulus
+            exponent >>= self.window
+        return result
+
+
+def power_function(base, modulus, exponent_bits, uses):
+    """
+    A function raising base to an exponent, with a :class:`FixedBase` table if the base
+    is expected to be raised often enough, i.e. *uses* times, for the table to pay off.
+
+    :return: the function exponent -> :math:`base^{exponent} \\pmod{modulus}`
+    """
+    if uses < 8:
+        return lambda exponent: pow(base, exponent, modulus)
+    window = 4 if uses < 128 else 6
+    return FixedBase(base, modulus, exponent_bits, window).pow
@@ -0,0 +1,280 @@
+"""
+A persistent index of linkability tags, e.g. the y~ of LWW signatures (see LWWRing.linkTag), to detect double signing.
+
+The index lives in a directory with two files:
+ tags.log: the append-only store, one record per tag: the 32 byte key, the length of the reference (4 bytes) and the reference
+ tags.idx: a header, a Bloom filter and an open addressing hash table from the keys to their records, used through mmap
+
+The key of a tag is sha256(fingerprint || tag), where the fingerprint identifies the ring, so that the same tag
+in two rings is not a match. The Bloom filter answers most lookups of new tags without touching the hash table.
+The log is written before the index, and records the index does not cover yet are replayed on opening,
+so the index survives a crash between the two writes.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+_MAGIC = b"LIBSIGLI"
+_HEADER = struct.Struct(">8sQQQ")  # magic, slots, count, covered length of the log
+_SLOT = struct.Struct(">32sQ")  # key, offset of the record in the log + 1, 0 for an empty slot
+_RECORD = struct.Struct(">32sI")  # key, length of the reference
+_BLOOM_HASHES = 6
+
+
+def tag_key(fingerprint, tag):
+    """
+    The key of a tag in a ring.
+
+    :param fingerprint: the bytes identifying the ring, e.g. LWWRing.fingerprint
+    :param tag: the tag, an int or bytes
+    :return: 32 bytes
+    """
+    if not isinstance(tag, (bytes, bytearray)):
+        tag = int(tag)
+        tag = tag.to_bytes((tag.bit_length() + 7) // 8 or 1, "big")
+    return hashlib.sha256(len(fingerprint).to_bytes(4, "big") + fingerprint + tag).digest()
+
+
+class LinkIndex:
+    """
+    The persistent set of the tags seen so far, with a reference to the signature each was first seen in.
+    All methods are thread safe, but a directory must only be opened by one LinkIndex at a time.
+
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> with LinkIndex(directory) as index:
+    ...     index.add(b"ring", 12345, b"first"), index.add(b"ring", 12345, b"second"), index.add(b"other", 12345)
+    (None, b'first', None)
+    >>> with LinkIndex(directory) as index:
+    ...     len(index), index.lookup(b"ring", 12345), index.lookup(b"ring", 54321)
+    (2, b'first', None)
+
+    :param directory: the directory of the index, which is created if necessary
+    :param capacity: the number of tags to make room for in a new index, it grows as needed
+    """
+
+    def __init__(self, directory, capacity=1 << 16):
+        self.directory = directory
+        self._lock = threading.RLock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._log = open(os.path.join(directory, "tags.log"), "a+b")
+        self._index_path = os.path.join(directory, "tags.idx")
+        if not os.path.exists(self._index_path):
+            slots = 1 << max(4, (2 * capacity - 1).bit_length())
+            self._write_empty_index(self._index_path, slots)
+        self._open_index()
+        self._replay()
+
+    # ------ the index file ------
+
+    @staticmethod
+    def _write_empty_index(path, slots):
+        with open(path, "wb") as index:
+            index.write(_HEADER.pack(_MAGIC, slots, 0, 0))
+            index.truncate(_HEADER.size + slots + slots * _SLOT.size)
+
+    def _open_index(self):
+        self._index_file = open(self._index_path, "r+b")
+        self._map = mmap.mmap(self._index_file.fileno(), 0)
+        magic, self._slots, self._count, self._covered = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError("{} is not a tag index".format(self._index_path))
+        self._bloom_bits = self._slots * 8
+        self._table = _HEADER.size + self._slots
+
+    def _close_index(self):
+        self._map.close()
+        self._index_file.close()
+
+    def _write_header(self):
+        _HEADER.pack_into(self._map, 0, _MAGIC, self._slots, self._count, self._covered)
+
+    def _bloom_positions(self, key):
+        # the key is a hash already, so its bytes serve as the hashes of the filter
+        return [int.from_bytes(key[4 * i:4 * i + 4], "big") % self._bloom_bits for i in range(_BLOOM_HASHES)]
+
+    def _may_contain(self, key):
+        for position in self._bloom_positions(key):
+            if not self._map[_HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _find(self, key):
+        """
+        :return: (slot, offset + 1) of the key, or (first empty slot, 0) if it is not in the table
+        """
+        mask = self._slots - 1
+        slot = int.from_bytes(key[24:32], "big") & mask
+        while True:
+            stored, offset = _SLOT.unpack_from(self._map, self._table + slot * _SLOT.size)
+            if offset == 0 or stored == key:
+                return slot, offset
+            slot = (slot + 1) & mask
+
+    def _insert(self, key, offset):
+        if 2 * (self._count + 1) > self._slots:
+            self._grow()
+        slot, found = self._find(key)
+        if found:
+            return
+        _SLOT.pack_into(self._map, self._table + slot * _SLOT.size, key, offset + 1)
+        for position in self._bloom_positions(key):
+            self._map[_HEADER.size + (position >> 3)] |= 1 << (position & 7)
+        self._count += 1
+
+    def _entries(self):
+        for slot in range(self._slots):
+            key, offset = _SLOT.unpack_from(self._map, self._table + slot * _SLOT.size)
+            if offset:
+                yield key, offset - 1
+
+    def _grow(self):
+        """Rebuild the table and the filter with twice the slots, and swap the files."""
+        entries = list(self._entries())
+        temporary = self._index_path + ".tmp"
+        self._write_empty_index(temporary, self._slots * 2)
+        covered = self._covered
+        self._close_index()
+        os.replace(temporary, self._index_path)
+        self._open_index()
+        for key, offset in entries:
+            self._insert(key, offset)
+        self._covered = covered
+        self._write_header()
+
+    # ------ the log ------
+
+    def _replay(self):
+        """Add the records of the log which are not in the index yet, and cut off a partly written record."""
+        self._log.seek(0, os.SEEK_END)
+        end = self._log.tell()
+        offset = self._covered
+        self._log.seek(offset)
+        while offset + _RECORD.size <= end:
+            key, length = _RECORD.unpack(self._log.read(_RECORD.size))
+            if offset + _RECORD.size + length > end:
+                break
+            self._log.seek(length, os.SEEK_CUR)
+            self._insert(key, offset)
+            offset += _RECORD.size + length
+        if offset != end:
+            self._log.truncate(offset)
+        self._covered = offset
+        self._write_header()
+
+    def _reference(self, offset):
+        self._log.seek(offset)
+        _, length = _RECORD.unpack(self._log.read(_RECORD.size))
+        return self._log.read(length)
+
+    # ------ public interface ------
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup_keys(self, keys):
+        """
+        :param keys: keys made by :func:`tag_key`
+        :return: the list of the references of the keys, None for the keys not in the index
+        """
+        with self._lock:
+            references = []
+            for key in keys:
+                offset = self._find(key)[1] if self._may_contain(key) else 0
+                references.append(self._reference(offset - 1) if offset else None)
+            return references
+
+    def add_keys(self, keys, references=None):
+        """
+        Add the keys which are not in the index yet, with the log records of all of them written at once.
+        A key which occurs twice in *keys* is added with the first reference.
+
+        :param keys: keys made by :func:`tag_key`
+        :param references: bytes for every key, e.g. the digest of the signed message, by default empty
+        :return: the list of the references the keys already had, None for the new ones
+        """
+        keys = list(keys)
+        references = [b""] * len(keys) if references is None else [bytes(reference) for reference in references]
+        if len(references) != len(keys):
+            raise ValueError("keys and references don't have the same size")
+        with self._lock:
+            previous = self.lookup_keys(keys)
+            self._log.seek(0, os.SEEK_END)
+            offset = self._log.tell()
+            records, new, pending = [], [], {}
+            for i, (key, reference) in enumerate(zip(keys, references)):
+                if previous[i] is not None:
+                    continue
+                if key in pending:
+                    previous[i] = pending[key]
+                    continue
+                pending[key] = reference
+                records.append(_RECORD.pack(key, len(reference)) + reference)
+                new.append((key, offset))
+                offset += len(records[-1])
+            if records:
+                self._log.write(b"".join(records))
+                self._log.flush()
+                for key, record_offset in new:
+                    self._insert(key, record_offset)
+                self._covered = offset
+                self._write_header()
+            return previous
+
+    def lookup_many(self, tags):
+        """
+        :param tags: pairs (fingerprint, tag)
+        :return: the list of the references of the tags, None for the tags not in the index
+        """
+        return self.lookup_keys([tag_key(fingerprint, tag) for fingerprint, tag in tags])
+
+    def add_many(self, tags):
+        """
+        :param tags: triples (fingerprint, tag, reference)
+        :return: the list of the references the tags already had, None for the new ones
+        """
+        tags = list(tags)
+        return self.add_keys([tag_key(fingerprint, tag) for fingerprint, tag, _ in tags],
+                             [reference for _, _, reference in tags])
+
+    def lookup(self, fingerprint, tag):
+        """
+        :return: the reference the tag was added with, or None if it is not in the index
+        """
+        return self.lookup_many([(fingerprint, tag)])[0]
+
+    def __contains__(self, item):
+        return self.lookup(*item) is not None
+
+    def add(self, fingerprint, tag, reference=b""):
+        """
+        Add the tag, unless it is in the index already.
+
+        :return: None for a new tag, else the reference it was added with before
+        """
+        return self.add_many([(fingerprint, tag, reference)])[0]
+
+    def flush(self):
+        """
+        Write the log and the index to the disk.
+        """
+        with self._lock:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._map.flush()
+
+    def close(self):
+        with self._lock:
+            if self._log.closed:
+                return
+            self.flush()
+            self._close_index()
+            self._log.close()
@@ -0,0 +1,158 @@
+"""
+Pools of expensive precomputed values, e.g. primes or keys, which a background thread keeps filled.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+
+class RefillPool:
+    """
+    Base class of the pools. Whenever fewer than *low* items are left, the refill thread generates
+    new ones until there are *high* of them. If the pool is empty, an item is generated synchronously.
+
+    Subclasses implement :meth:`_generate` and :meth:`_generate_now`, and may override
+    :meth:`_store` and :meth:`_retrieve` to keep the items somewhere else than in memory.
+
+    A forked child process starts with an empty, stopped pool, as the parent goes on handing out
+    the same items, e.g. keys or nonces. get() then generates items synchronously until start() is called.
+    """
+    def __init__(self, low=4, high=16, start=True, name=None):
+        if not 0 <= low < high:
+            raise ValueError("the watermarks must satisfy 0 <= low < high")
+        self.low = low
+        self.high = high
+        self.drawn = 0  # items taken from the pool
+        self.misses = 0  # items that had to be generated on the spot, because the pool was empty
+        self.generated = 0  # items generated by the refill thread
+        self._refill_seconds = 0.0
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._name = name or type(self).__name__
+        if hasattr(os, "register_at_fork"):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._after_fork())
+        if start:
+            self.start()
+
+    def __len__(self):
+        return len(self._items)
+
+    def start(self):
+        """
+        Start the refill thread, if it is not running yet.
+        """
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._refill, name=self._name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the refill thread and wait for it. The items already in the pool stay available.
+        """
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopped = True
+            self._condition.notify_all()
+        self._cancel()
+        if thread is not None:
+            thread.join()
+
+    def _after_fork(self):
+        """Called in a forked child: drop the items of the parent, its refill thread does not exist here."""
+        self._items.clear()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = True
+
+    def _refill(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopped or len(self._items) < self.low)
+                if self._stopped:
+                    return
+                missing = self.high - len(self._items)
+            start = time.perf_counter()
+            items = self._generate(missing)
+            try:
+                # hand out every item as soon as it is ready, instead of a whole batch at the end
+                for item in items:
+                    stored = self._store(item)
+                    with self._condition:
+                        self._items.append(stored)
+                        self.generated += 1
+                        self._condition.notify_all()
+                    if self._stopped:
+                        break
+            finally:
+                items.close()
+                self._refill_seconds += time.perf_counter() - start
+
+    def wait_filled(self, timeout=None):
+        """
+        Block until the pool holds *high* items, e.g. to warm it up.
+
+        :return: True, unless the timeout expired first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self._items) >= self.high, timeout)
+
+    def get(self):
+        """
+        Take an item from the pool. If it is empty, an item is generated synchronously.
+        """
+        with self._condition:
+            self.drawn += 1
+            if len(self._items) <= self.low:
+                self._condition.notify_all()
+            stored = self._items.popleft() if self._items else None
+            if stored is None:
+                self.misses += 1
+        if stored is None:
+            return self._generate_now()
+        return self._retrieve(stored)
+
+    def metrics(self):
+        """
+        The state of the pool:
+         depth: the number of items in the pool
+         drawn, misses, generated: the counters of the same name
+         refill_rate: the items generated per second the refill thread was busy
+
+        :return: a dict of the metrics
+        """
+        with self._condition:
+            return {
+                "depth": len(self._items),
+                "drawn": self.drawn,
+                "misses": self.misses,
+                "generated": self.generated,
+                "refill_rate": self.generated / self._refill_seconds if self._refill_seconds else 0.0,
+            }
+
+    def _generate(self, count):
+        """Yield *count* new items, called by the refill thread."""
+        raise NotImplementedError
+
+    def _generate_now(self):
+        """Return a new item, called by get() when the pool is empty."""
+        raise NotImplementedError
+
+    def _cancel(self):
+        """Called by stop(), to abort a running _generate()."""
+        pass
+
+    def _store(self, item):
+        """Return what is kept in the pool for a new item."""
+        return item
+
+    def _retrieve(self, stored):
+        """Return the item for what was kept in the pool."""
+        return stored
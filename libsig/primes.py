@@ -1,6 +1,13 @@
 # from gmpy import mpz, is_prime, setbit as bit_set, next_prime
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, CancelledError, as_completed, wait, FIRST_COMPLETED
 from gmpy2 import mpz, is_strong_bpsw_prp, bit_set
 from libsig import secrets
+from libsig.pool import RefillPool
 
 """ generation of primes
 from https://github.com/Chronic-Dev/libgcrypt/blob/master/cipher/primegen.c#L753
@@ -11,6 +18,232 @@ safe_prime_1024_2 = mpz(15786226906443994022851065571700536717238103374971814947
 safe_prime_2048_1 = mpz(31875063319476583474089642096002808986821120019388923550820311241143635510688978606260074843543503406177729419872219920879378521561550721128723409327288344094626341106781088735287836151436862590745544851283429281460660794089948568374839778484814060398861708108831200933525987909325227398182883259169505084369167065660823411144996843994673828630864697567838895733323253393082451689851082041041826040851948931611608019988245083749370267627393937005578783368343755590049940997150576192409347594457043970890265250509809535346754766268393899446480814966824139764465364363653303522872073051059428340389931266289636886972423)
 safe_prime_2048_2 = mpz(28279528956854311382393967453636545539930188167062102749496933987991775708347018627270580803309823806119365234883873065755359988782199669134847459237209435424000087073884493312079132564622015178977821522285725219441307093348787566932531883258396964492471036631634785736332476094888956264057006909522141451208726898835554813448189616121674162704637938636518584714801959248702812853220131853421922117430258107368368836901908386727601320910110216519963850643777748034538723380703963471501938067633414455944464136588425261814072585733479498258293168973903021299737360919250029799261615467685929200660563607766827563179079)
 
+""" standard groups for discrete logarithm based schemes
+
+The safe prime groups are taken from RFC 2409, RFC 3526 and RFC 7919, g = 2 generates their subgroup
+of prime order q = (p-1)/2.
+The groups "modpL-q256" have a subgroup of 256-bit prime order q, for exponents of only 256 bits.
+Nothing is hidden in them: q is the first prime after floor(2^254 pi), p = 2kq + 1 is the first prime
+with k >= floor(2^(L-2) e) / 2q, and g = 2^((p-1)/q) mod p.
+"""
+
+Group = namedtuple("Group", ["name", "p", "q", "g"])
+
+_SUBGROUP_ORDER_256 = """
+        C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74 020BBEA6 3B139B79"""
+
+# name: (bits of p, bits of q or None for q = (p-1)/2, p, q, g)
+_STANDARD_GROUPS = {
+    # RFC 2409, 6.2
+    "modp1024": (1024, None, """
+        FFFFFFFF FFFFFFFF C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74
+        020BBEA6 3B139B22 514A0879 8E3404DD EF9519B3 CD3A431B 302B0A6D F25F1437
+        4FE1356D 6D51C245 E485B576 625E7EC6 F44C42E9 A637ED6B 0BFF5CB6 F406B7ED
+        EE386BFB 5A899FA5 AE9F2411 7C4B1FE6 49286651 ECE65381 FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    # RFC 3526, 2
+    "modp1536": (1536, None, """
+        FFFFFFFF FFFFFFFF C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74
+        020BBEA6 3B139B22 514A0879 8E3404DD EF9519B3 CD3A431B 302B0A6D F25F1437
+        4FE1356D 6D51C245 E485B576 625E7EC6 F44C42E9 A637ED6B 0BFF5CB6 F406B7ED
+        EE386BFB 5A899FA5 AE9F2411 7C4B1FE6 49286651 ECE45B3D C2007CB8 A163BF05
+        98DA4836 1C55D39A 69163FA8 FD24CF5F 83655D23 DCA3AD96 1C62F356 208552BB
+        9ED52907 7096966D 670C354E 4ABC9804 F1746C08 CA237327 FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    # RFC 3526, 3
+    "modp2048": (2048, None, """
+        FFFFFFFF FFFFFFFF C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74
+        020BBEA6 3B139B22 514A0879 8E3404DD EF9519B3 CD3A431B 302B0A6D F25F1437
+        4FE1356D 6D51C245 E485B576 625E7EC6 F44C42E9 A637ED6B 0BFF5CB6 F406B7ED
+        EE386BFB 5A899FA5 AE9F2411 7C4B1FE6 49286651 ECE45B3D C2007CB8 A163BF05
+        98DA4836 1C55D39A 69163FA8 FD24CF5F 83655D23 DCA3AD96 1C62F356 208552BB
+        9ED52907 7096966D 670C354E 4ABC9804 F1746C08 CA18217C 32905E46 2E36CE3B
+        E39E772C 180E8603 9B2783A2 EC07A28F B5C55DF0 6F4C52C9 DE2BCBF6 95581718
+        3995497C EA956AE5 15D22618 98FA0510 15728E5A 8AACAA68 FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    # RFC 3526, 4
+    "modp3072": (3072, None, """
+        FFFFFFFF FFFFFFFF C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74
+        020BBEA6 3B139B22 514A0879 8E3404DD EF9519B3 CD3A431B 302B0A6D F25F1437
+        4FE1356D 6D51C245 E485B576 625E7EC6 F44C42E9 A637ED6B 0BFF5CB6 F406B7ED
+        EE386BFB 5A899FA5 AE9F2411 7C4B1FE6 49286651 ECE45B3D C2007CB8 A163BF05
+        98DA4836 1C55D39A 69163FA8 FD24CF5F 83655D23 DCA3AD96 1C62F356 208552BB
+        9ED52907 7096966D 670C354E 4ABC9804 F1746C08 CA18217C 32905E46 2E36CE3B
+        E39E772C 180E8603 9B2783A2 EC07A28F B5C55DF0 6F4C52C9 DE2BCBF6 95581718
+        3995497C EA956AE5 15D22618 98FA0510 15728E5A 8AAAC42D AD33170D 04507A33
+        A85521AB DF1CBA64 ECFB8504 58DBEF0A 8AEA7157 5D060C7D B3970F85 A6E1E4C7
+        ABF5AE8C DB0933D7 1E8C94E0 4A25619D CEE3D226 1AD2EE6B F12FFA06 D98A0864
+        D8760273 3EC86A64 521F2B18 177B200C BBE11757 7A615D6C 770988C0 BAD946E2
+        08E24FA0 74E5AB31 43DB5BFC E0FD108E 4B82D120 A93AD2CA FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    # RFC 3526, 5
+    "modp4096": (4096, None, """
+        FFFFFFFF FFFFFFFF C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74
+        020BBEA6 3B139B22 514A0879 8E3404DD EF9519B3 CD3A431B 302B0A6D F25F1437
+        4FE1356D 6D51C245 E485B576 625E7EC6 F44C42E9 A637ED6B 0BFF5CB6 F406B7ED
+        EE386BFB 5A899FA5 AE9F2411 7C4B1FE6 49286651 ECE45B3D C2007CB8 A163BF05
+        98DA4836 1C55D39A 69163FA8 FD24CF5F 83655D23 DCA3AD96 1C62F356 208552BB
+        9ED52907 7096966D 670C354E 4ABC9804 F1746C08 CA18217C 32905E46 2E36CE3B
+        E39E772C 180E8603 9B2783A2 EC07A28F B5C55DF0 6F4C52C9 DE2BCBF6 95581718
+        3995497C EA956AE5 15D22618 98FA0510 15728E5A 8AAAC42D AD33170D 04507A33
+        A85521AB DF1CBA64 ECFB8504 58DBEF0A 8AEA7157 5D060C7D B3970F85 A6E1E4C7
+        ABF5AE8C DB0933D7 1E8C94E0 4A25619D CEE3D226 1AD2EE6B F12FFA06 D98A0864
+        D8760273 3EC86A64 521F2B18 177B200C BBE11757 7A615D6C 770988C0 BAD946E2
+        08E24FA0 74E5AB31 43DB5BFC E0FD108E 4B82D120 A9210801 1A723C12 A787E6D7
+        88719A10 BDBA5B26 99C32718 6AF4E23C 1A946834 B6150BDA 2583E9CA 2AD44CE8
+        DBBBC2DB 04DE8EF9 2E8EFC14 1FBECAA6 287C5947 4E6BC05D 99B2964F A090C3A2
+        233BA186 515BE7ED 1F612970 CEE2D7AF B81BDD76 2170481C D0069127 D5B05AA9
+        93B4EA98 8D8FDDC1 86FFB7DC 90A6C08F 4DF435C9 34063199 FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    # RFC 7919, A.1
+    "ffdhe2048": (2048, None, """
+        FFFFFFFF FFFFFFFF ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695
+        A9E13641 146433FB CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A
+        D3DF1ED5 D5FD6561 2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935
+        984F0C70 E0E68B77 E2A689DA F3EFE872 1DF158A1 36ADE735 30ACCA4F 483A797A
+        BC0AB182 B324FB61 D108A94B B2C8E3FB B96ADAB7 60D7F468 1D4F42A3 DE394DF4
+        AE56EDE7 6372BB19 0B07A7C8 EE0A6D70 9E02FCE1 CDF7E2EC C03404CD 28342F61
+        9172FE9C E98583FF 8E4F1232 EEF28183 C3FE3B1B 4C6FAD73 3BB5FCBC 2EC22005
+        C58EF183 7D1683B2 C6F34A26 C1B2EFFA 886B4238 61285C97 FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    # RFC 7919, A.2
+    "ffdhe3072": (3072, None, """
+        FFFFFFFF FFFFFFFF ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695
+        A9E13641 146433FB CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A
+        D3DF1ED5 D5FD6561 2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935
+        984F0C70 E0E68B77 E2A689DA F3EFE872 1DF158A1 36ADE735 30ACCA4F 483A797A
+        BC0AB182 B324FB61 D108A94B B2C8E3FB B96ADAB7 60D7F468 1D4F42A3 DE394DF4
+        AE56EDE7 6372BB19 0B07A7C8 EE0A6D70 9E02FCE1 CDF7E2EC C03404CD 28342F61
+        9172FE9C E98583FF 8E4F1232 EEF28183 C3FE3B1B 4C6FAD73 3BB5FCBC 2EC22005
+        C58EF183 7D1683B2 C6F34A26 C1B2EFFA 886B4238 611FCFDC DE355B3B 6519035B
+        BC34F4DE F99C0238 61B46FC9 D6E6C907 7AD91D26 91F7F7EE 598CB0FA C186D91C
+        AEFE1309 85139270 B4130C93 BC437944 F4FD4452 E2D74DD3 64F2E21E 71F54BFF
+        5CAE82AB 9C9DF69E E86D2BC5 22363A0D ABC52197 9B0DEADA 1DBF9A42 D5C4484E
+        0ABCD06B FA53DDEF 3C1B20EE 3FD59D7C 25E41D2B 66C62E37 FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    # RFC 7919, A.3
+    "ffdhe4096": (4096, None, """
+        FFFFFFFF FFFFFFFF ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695
+        A9E13641 146433FB CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A
+        D3DF1ED5 D5FD6561 2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935
+        984F0C70 E0E68B77 E2A689DA F3EFE872 1DF158A1 36ADE735 30ACCA4F 483A797A
+        BC0AB182 B324FB61 D108A94B B2C8E3FB B96ADAB7 60D7F468 1D4F42A3 DE394DF4
+        AE56EDE7 6372BB19 0B07A7C8 EE0A6D70 9E02FCE1 CDF7E2EC C03404CD 28342F61
+        9172FE9C E98583FF 8E4F1232 EEF28183 C3FE3B1B 4C6FAD73 3BB5FCBC 2EC22005
+        C58EF183 7D1683B2 C6F34A26 C1B2EFFA 886B4238 611FCFDC DE355B3B 6519035B
+        BC34F4DE F99C0238 61B46FC9 D6E6C907 7AD91D26 91F7F7EE 598CB0FA C186D91C
+        AEFE1309 85139270 B4130C93 BC437944 F4FD4452 E2D74DD3 64F2E21E 71F54BFF
+        5CAE82AB 9C9DF69E E86D2BC5 22363A0D ABC52197 9B0DEADA 1DBF9A42 D5C4484E
+        0ABCD06B FA53DDEF 3C1B20EE 3FD59D7C 25E41D2B 669E1EF1 6E6F52C3 164DF4FB
+        7930E9E4 E58857B6 AC7D5F42 D69F6D18 7763CF1D 55034004 87F55BA5 7E31CC7A
+        7135C886 EFB4318A ED6A1E01 2D9E6832 A907600A 918130C4 6DC778F9 71AD0038
+        092999A3 33CB8B7A 1A1DB93D 7140003C 2A4ECEA9 F98D0ACC 0A8291CD CEC97DCF
+        8EC9B55A 7F88A46B 4DB5A851 F44182E1 C68A007E 5E655F6A FFFFFFFF FFFFFFFF""",
+        None, "2"),
+    "modp1024-q256": (1024, 256, """
+        ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695 A9E13641 146433FB
+        CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A D3DF1ED5 D5FD6561
+        2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935 984F0C70 E0E68BCE
+        01D9A1F8 DA552108 ACCD3A6A 351715DF 4BB97894 804EA125 C60D913A 97394FE9""",
+        _SUBGROUP_ORDER_256, """
+        2D3244E7 39BDCBD2 DBF3AE89 6E14DC06 C14B469A 600E095C 5A4C37C8 9823AA85
+        8909C4CE 839891B1 E3368A46 A6971F86 4E820C78 099DD8EA B5ED1962 D022C8E8
+        88946E1B 0CDDD444 C5A743B6 357A0ABB 9FB3D310 E35E1E2E 9E031A11 F1A6A0F6
+        93C8E70E F2CBC3A5 347B49BD 16AACED0 77C5AA93 40D01A68 2485B581 9D7F56A6"""),
+    "modp2048-q256": (2048, 256, """
+        ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695 A9E13641 146433FB
+        CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A D3DF1ED5 D5FD6561
+        2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935 984F0C70 E0E68B77
+        E2A689DA F3EFE872 1DF158A1 36ADE735 30ACCA4F 483A797A BC0AB182 B324FB61
+        D108A94B B2C8E3FB B96ADAB7 60D7F468 1D4F42A3 DE394DF4 AE56EDE7 6372BB19
+        0B07A7C8 EE0A6D70 9E02FCE1 CDF7E2EC C03404CD 28342F61 9172FE9C E98583FF
+        8E4F1232 EEF28183 C3FE3B1B 4C6FAD73 3BB5FCBC 2EC22005 C58EF183 7D1687E0
+        4FE3131C DBC2BA69 C333EFF3 F06EB831 E725F261 BBDC56CA 6878CE51 DC567031""",
+        _SUBGROUP_ORDER_256, """
+        8D8052F6 A4D90668 A7B6021F 721C8F9F 556FADC0 EA9ACBDD 53BC87AE 22A7537D
+        5206F8BD 53D5A1B7 38260799 889EAAE0 B9D64FF0 D97F4BFB C2EA0098 DB602708
+        DA0F0E72 848CA195 7869BBC5 9462A166 AB4412A4 7DCFB008 B80CC022 21132A28
+        0DD84724 0520A5F0 2F67E026 E17E8166 765FA5BD FB654382 2CC05502 31E95507
+        FD997629 EF9035A2 6F42D1D2 CBF093E0 CD918E20 1E7C38E8 6D118CA5 384CD992
+        B4A1A0E9 B2C02FAA EC7BFC10 DAC4C396 DA87F142 62E62F4E C1D57FB8 10EAD078
+        02ED40C3 9500138A B6D28F64 E7968741 5C33C756 03C882B0 A4AE9375 FFFCED42
+        4004E37A 10042A79 EFAB8D4E E67E1AD4 AB9B0EB8 E86ECAA5 C64DD8CA C5B04A74"""),
+    "modp3072-q256": (3072, 256, """
+        ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695 A9E13641 146433FB
+        CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A D3DF1ED5 D5FD6561
+        2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935 984F0C70 E0E68B77
+        E2A689DA F3EFE872 1DF158A1 36ADE735 30ACCA4F 483A797A BC0AB182 B324FB61
+        D108A94B B2C8E3FB B96ADAB7 60D7F468 1D4F42A3 DE394DF4 AE56EDE7 6372BB19
+        0B07A7C8 EE0A6D70 9E02FCE1 CDF7E2EC C03404CD 28342F61 9172FE9C E98583FF
+        8E4F1232 EEF28183 C3FE3B1B 4C6FAD73 3BB5FCBC 2EC22005 C58EF183 7D1683B2
+        C6F34A26 C1B2EFFA 886B4238 611FCFDC DE355B3B 6519035B BC34F4DE F99C0238
+        61B46FC9 D6E6C907 7AD91D26 91F7F7EE 598CB0FA C186D91C AEFE1309 85139270
+        B4130C93 BC437944 F4FD4452 E2D74DD3 64F2E21E 71F54BFF 5CAE82AB 9C9DF69E
+        E86D2BC5 22363A0D ABC52197 9B0DEADA 1DBF9A42 D5C4484E 0ABCD06B FA53E16A
+        D4E704DD EBAFE81C 8B9857C4 D652BFA9 4DCA9FE0 75EAF9DF 4DC5489E AAF2FE73""",
+        _SUBGROUP_ORDER_256, """
+        380B7339 A67684E4 195A0201 D279A0F3 44D83334 F61C4A31 312BC6B5 C3C93C69
+        E9E3D264 7B456B2B DEDFBEDB 2353588F 2957A82A 5ED38C6E CE7D1D27 767FD8F6
+        E289AD05 04ECA855 26DA9E30 14415EDC B0C76DCF 229AEF98 B6F001F5 7E3C9142
+        B6386182 E4CE38F8 60B1686E 0DE63593 CC4AB5FF CE64F28E 8DF9DE62 3D5BED67
+        C833D82E 87599FD0 74FC9A01 5702E016 7987D49B 9451F43B DD08097B 4ABD5F05
+        DD838C87 69434915 9F2016CD 607AAF87 686F589A BB43A438 B6F1376E 17FDF37A
+        E8307AFA 79690716 41A35616 3B97FE1F 09BC4291 B1A06D96 34B0C146 F495C5FE
+        26C30627 3DBA8458 26EB62DD D2A97F9B 965EE39D F8E4A885 5553858D E590F65E
+        6367BEE8 51877323 4B46C801 940B5B7C 9D488C43 B15C721E 3704254B FBFA4785
+        F7ACB637 E3EAD1E4 4C968415 8F8231DC 95C5F147 362F02CB 664551FA A5FA171A
+        9AF64E19 CF7D6263 8D925399 6DF5531C 85B92BFF 815FA775 8D43B19E AB95E687
+        3B0EBC1F 4C09A3B8 56FC23CA 360B72AB E650628C 689C936D 55A7E0ED 4D75BF0E"""),
+
+}
+
+
+def _parse_hex(text):
+    return mpz("".join(text.split()), 16)
+
+
+@lru_cache(maxsize=None)
+def _load_group(name):
+    _, _, p, q, g = _STANDARD_GROUPS[name]
+    p = _parse_hex(p)
+    q = p // 2 if q is None else _parse_hex(q)
+    return Group(name, p, q, _parse_hex(g))
+
+
+def group_names():
+    """
+    The names of the standard groups, see :func:`get_group`.
+    """
+    return list(_STANDARD_GROUPS)
+
+
+def get_group(name_or_size=1024, order_bits=None):
+    """
+    Look up a standard group by its name or by the bit length of p.
+    The constants are only parsed when a group is requested for the first time.
+
+    :param name_or_size: the name of the group, or the size of p in bits
+    :param order_bits: when looking up by size, the size of the subgroup order q in bits,
+                       None selects a safe prime group
+    :return: a Group(name, p, q, g), where g generates the subgroup of prime order q
+    >>> group = get_group(2048)
+    >>> group.name, group.p.bit_length(), group.q == group.p // 2, pow(group.g, group.q, group.p)
+    ('modp2048', 2048, True, mpz(1))
+    >>> get_group(1024, order_bits=256).name
+    'modp1024-q256'
+    >>> get_group("ffdhe3072").p.bit_length()
+    3072
+    """
+    if isinstance(name_or_size, str):
+        if name_or_size not in _STANDARD_GROUPS:
+            raise ValueError("unknown group {}".format(name_or_size))
+        return _load_group(name_or_size)
+    for name, (bits, q_bits, _, _, _) in _STANDARD_GROUPS.items():
+        if bits == name_or_size and q_bits == order_bits:
+            return _load_group(name)
+    raise ValueError("no standard group with {} bits and order {}".format(name_or_size, order_bits))
+
+
 def _prime_check_count(bit_count):
     """
     from openssl https://github.com/openssl/openssl/blob/6f0ac0e2f27d9240516edb9a23b7863e7ad02898/include/openssl/bn.h#L121
@@ -36,15 +269,62 @@ def _prime_check_count(bit_count):
             return count
 
 
-def _prime_generator(seed, bit_count, verbose=False):
-    if is_strong_bpsw_prp(seed):
-        yield seed
-    for step in range(0, 20000, 2):
-        prime = seed + step
-        if verbose and step % 20 == 0 :
+def _small_primes(limit):
+    """
+    The odd primes below *limit*, by the sieve of Eratosthenes.
+
+    >>> _small_primes(30)
+    [3, 5, 7, 11, 13, 17, 19, 23, 29]
+    """
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i*i::i] = bytes(len(range(i*i, limit, i)))
+    return [i for i in range(3, limit) if sieve[i]]
+
+
+# seeds have at least 16 bits, so no candidate can be one of the sieving primes itself
+_SIEVE_PRIMES = _small_primes(1 << 12)
+_SEARCH_WINDOW = 20000
+
+
+def _sieve_window(seed, length, sieve_primes=_SIEVE_PRIMES):
+    """
+    A bitmap over the odd candidates seed + 2k, k < length, which is 0 where the candidate has a small factor.
+    For every small prime the residue of the seed is computed once, and all its multiples
+    in the window are struck out with a single slice assignment.
+
+    >>> window = _sieve_window(mpz(65537), 10)
+    >>> [65537 + 2*k for k in range(10) if window[k]]
+    [65537, 65539, 65543, 65551]
+    """
+    candidates = bytearray([1]) * length
+    for p in sieve_primes:
+        # seed + 2k = 0 mod p  <=>  k = -seed * 2^-1 mod p, and 2^-1 = (p+1)/2 mod p
+        k = (-int(seed % p) * ((p + 1) // 2)) % p
+        candidates[k::p] = bytes(len(range(k, length, p)))
+    return candidates
+
+
+def _prime_generator(seed, bit_count, verbose=False, sieve=True):
+    """
+    Yield the probable primes in [seed, seed + 20000).
+    Unless *sieve* is False, candidates with a small factor are sieved out before the BPSW test.
+    """
+    length = _SEARCH_WINDOW // 2
+    if sieve:
+        candidates = _sieve_window(seed, length)
+    else:
+        candidates = bytearray([1]) * length
+    k = candidates.find(1)
+    while k != -1:
+        if verbose:
             print(".", end="", flush=True)
+        prime = seed + 2*k
         if is_strong_bpsw_prp(prime):
             yield prime
+        k = candidates.find(1, k + 1)
 
 
 def _prime_seed_generator(bit_count, secret_prime=True):
@@ -57,6 +337,69 @@ def _prime_seed_generator(bit_count, secret_prime=True):
         yield seed
 
 
+_SAFE_SEARCH_WINDOW = 1 << 18
+
+
+def _safe_sieve_window(seed, length, sieve_primes=_SIEVE_PRIMES):
+    """
+    A bitmap over the odd candidates q = seed + 2k, k < length, which is 0 where q or 2q + 1 has a small factor.
+
+    >>> window = _safe_sieve_window(mpz(32769), 20)
+    >>> [2*(32769 + 2*k) + 1 for k in range(20) if window[k]]
+    [65543, 65579]
+    """
+    candidates = bytearray([1]) * length
+    for p in sieve_primes:
+        half = (p + 1) // 2
+        residue = int(seed % p)
+        # q = 0 mod p
+        k = (-residue * half) % p
+        candidates[k::p] = bytes(len(range(k, length, p)))
+        # 2q + 1 = 0 mod p  <=>  q = (p-1)/2 mod p
+        k = (((p - 1) // 2 - residue) * half) % p
+        candidates[k::p] = bytes(len(range(k, length, p)))
+    return candidates
+
+
+def _safe_prime_generator(seed, bit_count, verbose=False, stop=None):
+    """
+    Yield the safe primes 2q + 1 for the q in [seed, seed + 2^18).
+    The smaller q is tested first, p = 2q + 1 only if q is a probable prime.
+    A window takes about a second at 1024 bits, so *stop* is checked before every candidate.
+    """
+    length = _SAFE_SEARCH_WINDOW // 2
+    candidates = _safe_sieve_window(seed, length)
+    k = candidates.find(1)
+    while k != -1:
+        if stop is not None and stop.is_set():
+            return
+        if verbose:
+            print(".", end="", flush=True)
+        q = seed + 2*k
+        if is_strong_bpsw_prp(q) and is_strong_bpsw_prp(2*q + 1):
+            yield 2*q + 1
+        k = candidates.find(1, k + 1)
+
+
+def _search_safe_prime(bit_count, secret_prime=True, verbose=False, stop=None):
+    """
+    Walk through random seeds for p' until a safe prime p = 2p' + 1 of *bit_count* bits is found.
+
+    :param stop: an optional event, the search gives up and returns None once it is set
+    """
+    # a seed of bit_count-1 bits with the two highest bits set gives such a p
+    for seed in _prime_seed_generator(bit_count - 1, secret_prime):
+        if stop is not None and stop.is_set():
+            return None
+        for prime in _safe_prime_generator(seed, bit_count, verbose, stop):
+            if prime.bit_length() == bit_count:
+                if verbose:
+                    print()
+                return prime
+        if verbose:
+            print(":", flush=True)
+
+
 def is_safe_prime(prime):
     """
     A prime number p is called *safe* if :math:`p = 2p' + 1`, such that :math:`p'` is also a prime number.
@@ -66,21 +409,15 @@ def is_safe_prime(prime):
     return is_strong_bpsw_prp(prime//2)
 
 
-def gen_prime(bit_count, secret_prime=True, randomlevel=0, extra_check=None, verbose=False):
-    """
-    >>> p = gen_prime(1024 // 2, extra_check=is_safe_prime)
-    >>> is_strong_bpsw_prp(p)
-    True
-    >>> is_strong_bpsw_prp(p//2)
-    True
+def _search_prime(bit_count, secret_prime=True, extra_check=None, verbose=False, stop=None):
     """
+    Walk through random seeds until a prime of *bit_count* bits passing *extra_check* is found.
 
-    min_bits = 16
-    if bit_count < min_bits:
-        print("can't generate a prime with less than {:d} bits".format(min_bits))
-        return None
-
-    for counter, seed in enumerate(_prime_seed_generator(bit_count, secret_prime)):
+    :param stop: an optional event, the search gives up and returns None once it is set
+    """
+    for seed in _prime_seed_generator(bit_count, secret_prime):
+        if stop is not None and stop.is_set():
+            return None
         for prime in _prime_generator(seed, bit_count, verbose):
             if not prime.bit_length() == bit_count:
                 continue
@@ -94,10 +431,217 @@ def gen_prime(bit_count, secret_prime=True, randomlevel=0, extra_check=None, ver
                 return prime
             elif verbose:
                 print("/", end="", flush=True)
+            if stop is not None and stop.is_set():
+                return None
         if verbose:
             print(":", flush=True)
 
 
+_worker_stop = None
+
+
+def _init_search_worker(stop):
+    global _worker_stop
+    _worker_stop = stop
+
+
+def _search_worker(search, args):
+    return search(*args, stop=_worker_stop)
+
+
+def _parallel_search(count, search, args, workers):
+    """
+    Let *workers* processes run search(*args) on independent seeds and collect the first *count* distinct primes.
+    As soon as enough primes are found, the remaining searches are cancelled.
+    """
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    found = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_search_worker, initargs=(stop,)) as pool:
+        pending = {pool.submit(_search_worker, search, args) for _ in range(workers)}
+        while len(found) < count:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                prime = future.result()
+                if prime is not None and prime not in found:
+                    found.append(prime)
+            for _ in range(min(len(done), count - len(found))):
+                pending.add(pool.submit(_search_worker, search, args))
+        stop.set()
+    return found[:count]
+
+
+def _collect_primes(count, search, args, workers):
+    """
+    Run *search* until *count* distinct primes are found, in a process pool if *workers* > 1.
+    """
+    workers = _default_workers(workers)
+    if workers > 1:
+        return _parallel_search(count, search, args, workers)
+    primes = []
+    while len(primes) < count:
+        prime = search(*args)
+        if prime not in primes:
+            primes.append(prime)
+    return primes
+
+
+def _valid_bit_count(bit_count):
+    min_bits = 16
+    if bit_count < min_bits:
+        print("can't generate a prime with less than {:d} bits".format(min_bits))
+        return False
+    return True
+
+
+def _default_workers(workers):
+    if workers is None:
+        return os.cpu_count() or 1
+    return workers
+
+
+def gen_prime(bit_count, secret_prime=True, randomlevel=0, extra_check=None, verbose=False, workers=1):
+    """
+    Generate a random prime with exactly *bit_count* bits.
+
+    With *workers* > 1, the search is spread over a pool of processes which try independent seeds,
+    the first hit cancels the others. ``workers=None`` uses one process per cpu.
+
+    >>> p = gen_prime(1024 // 2, extra_check=is_safe_prime)
+    >>> is_strong_bpsw_prp(p)
+    True
+    >>> is_strong_bpsw_prp(p//2)
+    True
+    >>> p = gen_prime(256, workers=2)
+    >>> is_strong_bpsw_prp(p), p.bit_length()
+    (True, 256)
+    """
+
+    if not _valid_bit_count(bit_count):
+        return None
+
+    return _collect_primes(1, _search_prime, (bit_count, secret_prime, extra_check, verbose), workers)[0]
+
+
+def gen_primes(count, bit_count, secret_prime=True, extra_check=None, verbose=False, workers=1):
+    """
+    Generate *count* distinct primes of *bit_count* bits, e.g. the factors of an RSA modulus.
+    With *workers* > 1 they are searched for concurrently, see :func:`gen_prime`.
+
+    >>> p, q = gen_primes(2, 256, workers=2)
+    >>> p != q and is_strong_bpsw_prp(p) and is_strong_bpsw_prp(q)
+    True
+    """
+    if not _valid_bit_count(bit_count):
+        return None
+
+    return _collect_primes(count, _search_prime, (bit_count, secret_prime, extra_check, verbose), workers)
+
+
+def gen_safe_prime(bit_count, secret_prime=True, verbose=False, workers=1):
+    """
+    Generate a random safe prime :math:`p = 2p' + 1` with exactly *bit_count* bits.
+
+    Unlike ``gen_prime(bit_count, extra_check=is_safe_prime)`` the search runs over :math:`p'`
+    and sieves :math:`p'` and :math:`p` together, see :func:`_safe_prime_generator`.
+
+    >>> p = gen_safe_prime(512)
+    >>> is_strong_bpsw_prp(p), is_safe_prime(p), p.bit_length()
+    (True, True, 512)
+    """
+    return gen_safe_primes(1, bit_count, secret_prime, verbose, workers)[0]
+
+
+def gen_safe_primes(count, bit_count, secret_prime=True, verbose=False, workers=1):
+    """
+    Generate *count* distinct safe primes of *bit_count* bits, concurrently if *workers* > 1.
+
+    >>> p, q = gen_safe_primes(2, 128, workers=2)
+    >>> p != q and is_safe_prime(p) and is_safe_prime(q)
+    True
+    """
+    if not _valid_bit_count(bit_count):
+        return None
+
+    return _collect_primes(count, _search_safe_prime, (bit_count, secret_prime, verbose), workers)
+
+
+class PrimePool(RefillPool):
+    """
+    A stock of random primes of *bit_count* bits, kept filled by a background thread.
+    Whenever fewer than *low* primes are left, the thread generates new ones until there are *high* of them.
+    With *workers* > 1 the thread lets a process pool, which lives as long as the pool is running,
+    search for one prime per task.
+
+    >>> pool = PrimePool(64, low=2, high=4)
+    >>> prime = pool.get()
+    >>> is_strong_bpsw_prp(prime), prime.bit_length()
+    (True, 64)
+    >>> pool.stop()
+    """
+    def __init__(self, bit_count, secret_prime=False, low=4, high=16, workers=1, start=True):
+        self.bit_count = bit_count
+        self.secret_prime = secret_prime
+        self.workers = _default_workers(workers)
+        self._executor = None
+        super().__init__(low, high, start, name="PrimePool-{:d}".format(bit_count))
+
+    def start(self):
+        with self._condition:
+            if self._executor is None and self.workers > 1:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        super().start()
+
+    def _after_fork(self):
+        super()._after_fork()
+        self._executor = None  # the worker processes belong to the parent
+
+    def _cancel(self):
+        with self._condition:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _generate(self, count):
+        if self.workers <= 1:
+            for _ in range(count):
+                yield gen_prime(self.bit_count, self.secret_prime)
+            return
+        executor = self._executor
+        try:
+            futures = [executor.submit(_search_prime, self.bit_count, self.secret_prime) for _ in range(count)]
+        except (AttributeError, RuntimeError):
+            return  # the pool was stopped in the meantime
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except CancelledError:
+            return
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _generate_now(self):
+        return gen_prime(self.bit_count, self.secret_prime)
+
+
+_prime_pools = {}
+_prime_pools_lock = threading.Lock()
+
+
+def get_prime_pool(bit_count, secret_prime=False, **kwargs):
+    """
+    The shared :class:`PrimePool` for primes of *bit_count* bits, created on first use.
+    The keyword arguments are passed to the constructor of a new pool and ignored otherwise.
+    """
+    with _prime_pools_lock:
+        key = (bit_count, secret_prime)
+        if key not in _prime_pools:
+            _prime_pools[key] = PrimePool(bit_count, secret_prime, **kwargs)
+        return _prime_pools[key]
+
+
 if __name__ == "__main__":
     p = gen_prime(1024, extra_check=is_safe_prime)
     print(p)
@@ -6,7 +6,8 @@ https://www.python.org/dev/peps/pep-0506/
 
 """
 
-__all__ = ['choice', 'randbelow', 'randbits', 'SystemRandom',
+__all__ = ['choice', 'randbelow', 'randbits', 'randrange', 'SystemRandom',
+           'randbelow_many', 'randrange_many', 'BufferedRandom',
            'token_bytes', 'token_hex', 'token_urlsafe',
            'compare_digest',
            ]
@@ -14,27 +15,142 @@ __all__ = ['choice', 'randbelow', 'randbits', 'SystemRandom',
 
 import base64
 import binascii
+import hashlib
 import os
+import threading
+import weakref
 
 from hmac import compare_digest
-from random import SystemRandom
+from random import Random, SystemRandom
 
 _sysrand = SystemRandom()
 
-randbits = _sysrand.getrandbits
-choice = _sysrand.choice
+
+class BufferedRandom(Random):
+    """Alternate random number generator, which serves random bytes from a buffer
+    instead of calling os.urandom for every number.
+
+    The buffer is filled by SHAKE-256 in counter mode, keyed with 32 bytes from
+    os.urandom. Every refill also replaces the key with fresh output, so earlier
+    output can not be recovered from the state. The key is reseeded from os.urandom
+    after *reseed_interval* bytes and in the child after a fork.
+
+    Like SystemRandom, seeding is not deterministic and the state can not be saved.
+
+    >>> rand = BufferedRandom()
+    >>> rand.getrandbits(256) < 2**256
+    True
+    >>> all(0 <= r < 10 for r in rand.randbelow_many(10, 100))
+    True
+    """
+
+    def __init__(self, buffer_size=4096, reseed_interval=1 << 20):
+        self._lock = threading.Lock()
+        self._buffer_size = buffer_size
+        self._reseed_interval = reseed_interval
+        super().__init__()
+        if hasattr(os, "register_at_fork"):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._reseed_after_fork())
+
+    def seed(self, *args, **kwds):
+        """Reseed from os.urandom, the arguments are ignored."""
+        with self._lock:
+            self._reseed()
+
+    def _reseed(self):
+        self._key = os.urandom(32)
+        self._counter = 0
+        self._since_reseed = 0
+        self._buffer = b""
+        self._position = 0
+
+    def _reseed_after_fork(self):
+        # another thread of the parent may have held the lock while forking
+        self._lock = threading.Lock()
+        self.seed()
+
+    def _refill(self, nbytes):
+        size = max(self._buffer_size, nbytes)
+        if self._since_reseed + size > self._reseed_interval:
+            self._reseed()
+        block = hashlib.shake_256(self._key + self._counter.to_bytes(8, "big")).digest(32 + size)
+        self._counter += 1
+        self._since_reseed += size
+        self._key = block[:32]
+        self._buffer = self._buffer[self._position:] + block[32:]
+        self._position = 0
+
+    def randbytes(self, nbytes):
+        """Return *nbytes* random bytes."""
+        with self._lock:
+            if self._position + nbytes > len(self._buffer):
+                self._refill(nbytes)
+            start = self._position
+            self._position += nbytes
+            return self._buffer[start:self._position]
+
+    def random(self):
+        """Get the next random number in the range [0.0, 1.0)."""
+        return (int.from_bytes(self.randbytes(7), "big") >> 3) * 2 ** -53
+
+    def getrandbits(self, k):
+        """getrandbits(k) -> x.  Generates an int with k random bits."""
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        nbytes = (k + 7) // 8
+        return int.from_bytes(self.randbytes(nbytes), "big") >> (nbytes * 8 - k)
+
+    def randbelow_many(self, exclusive_upper_bound, count):
+        """Return a list of *count* random ints in the range [0, n).
+        The random bytes for the whole batch are taken from the buffer at once."""
+        if exclusive_upper_bound <= 0:
+            raise ValueError("Upper bound must be positive.")
+        k = exclusive_upper_bound.bit_length()
+        nbytes = (k + 7) // 8
+        shift = nbytes * 8 - k
+        result = []
+        while len(result) < count:
+            data = self.randbytes((count - len(result)) * nbytes)
+            for i in range(0, len(data), nbytes):
+                r = int.from_bytes(data[i:i + nbytes], "big") >> shift
+                if r < exclusive_upper_bound:
+                    result.append(r)
+        return result
+
+    def _notimplemented(self, *args, **kwds):
+        "Method should not be called for a buffered random number generator."
+        raise NotImplementedError('Buffered entropy source does not have state.')
+    getstate = setstate = _notimplemented
+
+
+_bufrand = BufferedRandom()
+
+randbits = _bufrand.getrandbits
+choice = _bufrand.choice
 
 
 def randbelow(exclusive_upper_bound):
     """Return a random int in the range [0, n)."""
-    return _sysrand._randbelow(exclusive_upper_bound)
+    if exclusive_upper_bound <= 0:
+        raise ValueError("Upper bound must be positive.")
+    return _bufrand._randbelow(exclusive_upper_bound)
 
 
 def randrange(inclusive_lower_bound, exclusive_upper_bound):
-    r = randbelow(exclusive_upper_bound)
-    while r < inclusive_lower_bound:
-        r = randbelow(exclusive_upper_bound)
-    return r
+    """Return a random int in the range [a, b)."""
+    return inclusive_lower_bound + randbelow(exclusive_upper_bound - inclusive_lower_bound)
+
+
+def randbelow_many(exclusive_upper_bound, count):
+    """Return a list of *count* random ints in the range [0, n)."""
+    return _bufrand.randbelow_many(exclusive_upper_bound, count)
+
+
+def randrange_many(inclusive_lower_bound, exclusive_upper_bound, count):
+    """Return a list of *count* random ints in the range [a, b)."""
+    offsets = randbelow_many(exclusive_upper_bound - inclusive_lower_bound, count)
+    return [inclusive_lower_bound + offset for offset in offsets]
 
 
 DEFAULT_ENTROPY = 32  # number of bytes to return by default
@@ -1,6 +1,10 @@
+import hashlib
+import os
+import tempfile
 import unittest
-from libsig.LWW_Scheme import LWW
-from libsig.primes import safe_prime_1024_1
+from libsig.LWW_Scheme import LWW, LWWKeyStore, LWWRing, _RingTranscript
+from libsig.linkability import LinkIndex
+from libsig.primes import get_group
 
 
 class TestLWW(unittest.TestCase):
@@ -11,8 +15,20 @@ class TestLWW(unittest.TestCase):
     def test_keygen_NoArguments_UseDefaultValues(self):
         publicKey, privateKey, default_q, default_g = LWW.keygen()
 
-        self.assertEqual(default_q, safe_prime_1024_1)
-        self.assertEqual(default_g, 123456)
+        self.assertEqual(default_q, get_group(1024).p)
+        self.assertEqual(default_g, get_group(1024).g)
+
+    def test_sign_and_verify_WithDefaultGroup(self):
+        """
+        Test that keys of the default group form a ring.
+        """
+        completeKeys = [LWW.keygen() for _ in range(3)]
+        publicKeys = [(y, q, g) for y, x, q, g in completeKeys]
+        message = str.encode("You can't stump the Trump!")
+
+        signature = LWW.ringsign(completeKeys[1][1], publicKeys, message)
+
+        self.assertTrue(LWW.verify(publicKeys, message, signature))
 
     def test_keygen_GetCorrectlyCalculatedPublicKey(self):
         publicKey, privateKey, q, g = LWW.keygen(13, 2)
@@ -53,6 +69,270 @@ class TestLWW(unittest.TestCase):
 
         self.assertTrue(LWW.verify(publicKeys, message, signature), True)
 
+    def test_repr_transcript_matches_repr_of_K(self):
+        """
+        Test that the prefix reusing repr transcript hashes exactly repr(K), like earlier versions.
+        """
+        publicKeys = [LWW.keygen()[0] for _ in range(3)]
+        q = LWW.keygen()[2]
+        message = str.encode("You can't stump the Trump!")
+        ringTranscript = _RingTranscript(publicKeys, q)
+        self.assertEqual(ringTranscript.h, LWW.h2(repr(publicKeys).encode(), q))
+        challenge = ringTranscript.chain(publicKeys[0], message)
+        K = [publicKeys, publicKeys[0], message, publicKeys[1], publicKeys[2]]
+        self.assertEqual(challenge(publicKeys[1], publicKeys[2]), LWW.h1(repr(K).encode(), q))
+
+    def test_sign_and_verify_BinaryTranscript(self):
+        """
+        Test signatures with the binary transcript, which only verify with the same transcript.
+        """
+        completeKeys = [LWW.keygen() for _ in range(4)]
+        publicKeys = [(y, q, g) for y, x, q, g in completeKeys]
+        message = str.encode("You can't stump the Trump!")
+
+        signature = LWW.ringsign(completeKeys[2][1], publicKeys, message, transcript="binary")
+
+        self.assertTrue(LWW.verify(publicKeys, message, signature, transcript="binary"))
+        self.assertFalse(LWW.verify(publicKeys, message, signature))
+        self.assertFalse(LWW.verify(publicKeys, message + b"!", signature, transcript="binary"))
+
+    def test_verify_BinaryTranscript_malformed(self):
+        """
+        Test that a y~ outside of the group is rejected instead of raising, and that a message must be bytes.
+        """
+        completeKeys = [LWW.keygen() for _ in range(3)]
+        publicKeys = [(y, q, g) for y, x, q, g in completeKeys]
+        message = str.encode("You can't stump the Trump!")
+        c1, s, y_Tilde = LWW.ringsign(completeKeys[0][1], publicKeys, message, transcript="binary")
+        q = completeKeys[0][2]
+        for malformed in [y_Tilde + q, -y_Tilde]:
+            self.assertFalse(LWW.verify(publicKeys, message, [c1, s, malformed], transcript="binary"))
+        with self.assertRaises(TypeError):
+            LWW.ringsign(completeKeys[0][1], publicKeys, 3, transcript="binary")
+        with self.assertRaises(TypeError):
+            LWW.verify(publicKeys, 3, [c1, s, y_Tilde], transcript="binary")
+
+    def test_unknown_transcript(self):
+        publicKeys, privateKey = self.generatorDummy(2, 0)
+        with self.assertRaises(ValueError):
+            LWW.ringsign(privateKey, publicKeys, b"message", transcript="json")
+
+    def test_ring_context_reused(self):
+        """
+        Test that a LWWRing can be used for many signatures and with the plain key list.
+        """
+        publicKeys, privateKey = self.generatorDummy(5, 3)
+        ring = LWWRing(publicKeys, transcript="binary")
+        for message in [b"first", b"second"]:
+            signature = LWW.ringsign(privateKey, ring, message)
+            self.assertTrue(LWW.verify(ring, message, signature))
+            self.assertTrue(LWW.verify(publicKeys, message, signature, transcript="binary"))
+        self.assertEqual(ring.yTilde(privateKey), signature[2])
+
+    def test_ring_context_errors(self):
+        completeKeys = [LWW.keygen() for _ in range(3)]
+        ring = LWWRing([(y, q, g) for y, x, q, g in completeKeys])
+        with self.assertRaises(ValueError):
+            LWW.ringsign(completeKeys[0][1], ring, b"message", transcript="binary")
+        outsider = LWW.keygen()
+        with self.assertRaises(ValueError):
+            LWW.ringsign(outsider[1], ring, b"message")
+
+    def test_sign_and_verify_WithSubgroup(self):
+        """
+        Test that keys of a group with a 256 bit order carry the order and sign with short exponents.
+        """
+        completeKeys = [LWW.keygen(group="modp1024-q256") for _ in range(4)]
+        publicKeys = [(y, q, g, order) for y, x, q, g, order in completeKeys]
+        message = str.encode("You can't stump the Trump!")
+
+        for transcript in ["repr", "binary"]:
+            signature = LWW.ringsign(completeKeys[1][1], publicKeys, message, transcript=transcript)
+            self.assertTrue(LWW.verify(publicKeys, message, signature, transcript=transcript))
+            self.assertFalse(LWW.verify(publicKeys, message + b"!", signature, transcript=transcript))
+            order = completeKeys[0][4]
+            self.assertTrue(all(0 <= s < order for s in signature[1]))
+            self.assertLess(signature[0], order)
+
+        # y~ must be in the subgroup, e.g. not -y~
+        c1, s, y_Tilde = signature
+        self.assertFalse(LWW.verify(publicKeys, message, [c1, s, completeKeys[0][2] - y_Tilde], transcript="binary"))
+
+    def test_subgroup_keys_do_not_mix(self):
+        completeKeys = [LWW.keygen(group="modp1024-q256"), LWW.keygen(group="modp1024-q256")]
+        publicKeys = [(y, q, g, order) for y, x, q, g, order in completeKeys]
+        y, x, q, g, order = completeKeys[0]
+        with self.assertRaises(ValueError):
+            LWWRing(publicKeys + [(y, q, g)])
+        with self.assertRaises(ValueError):
+            LWWRing([(y, q, g, order + 2)])
+
+    def test_precomputation_used_once(self):
+        """
+        Test that signatures use the precomputed entries, each only once, and still verify.
+        """
+        completeKeys = [LWW.keygen(group="modp1024-q256") for _ in range(4)]
+        ring = LWWRing([(y, q, g, order) for y, x, q, g, order in completeKeys])
+        precomputation = ring.precompute(depth=3, low=1, start=False)
+        self.assertEqual(precomputation.metrics()["used"], 0)
+        precomputation.start()
+        self.assertTrue(precomputation.wait_filled(timeout=30))
+        precomputation.stop()
+
+        signatures = [LWW.ringsign(completeKeys[2][1], ring, b"message") for _ in range(5)]
+
+        for signature in signatures:
+            self.assertTrue(LWW.verify(ring, b"message", signature))
+        self.assertEqual(len({signature[0] for signature in signatures}), 5)
+        metrics = precomputation.metrics()
+        self.assertEqual(metrics["used"], 3)
+        self.assertEqual(metrics["misses"], 2)
+        self.assertEqual(len(precomputation), 0)
+
+    def test_sign_and_verify_Parallel(self):
+        """
+        Test that signatures made with a process pool verify sequentially, and the other way around.
+        """
+        completeKeys = [LWW.keygen(group="modp1024-q256") for _ in range(40)]
+        ring = LWWRing([(y, q, g, order) for y, x, q, g, order in completeKeys])
+        message = str.encode("You can't stump the Trump!")
+        try:
+            signature = LWW.ringsign(completeKeys[7][1], ring, message, workers=2)
+            self.assertTrue(LWW.verify(ring, message, signature))
+            self.assertFalse(LWW.verify(ring, message + b"!", signature, workers=2))
+            signature = LWW.ringsign(completeKeys[39][1], ring, message)
+            self.assertTrue(LWW.verify(ring, message, signature, workers=2))
+        finally:
+            ring.shutdown()
+
+    def test_verify_WithLinkIndex(self):
+        """
+        Test that a second signature of the same signer in the same ring is rejected by the link check.
+        """
+        completeKeys = [LWW.keygen(group="modp1024-q256") for _ in range(3)]
+        publicKeys = [(y, q, g, order) for y, x, q, g, order in completeKeys]
+        ring = LWWRing(publicKeys)
+        first = LWW.ringsign(completeKeys[0][1], ring, b"first")
+        second = LWW.ringsign(completeKeys[0][1], ring, b"second")
+        other = LWW.ringsign(completeKeys[1][1], ring, b"second")
+        with tempfile.TemporaryDirectory() as directory, LinkIndex(directory) as index:
+            self.assertFalse(LWW.verify(ring, b"second", first, linkIndex=index))
+            self.assertIsNone(LWW.link_check(ring, first, index))
+            self.assertTrue(LWW.verify(ring, b"first", first, linkIndex=index))
+            self.assertEqual(LWW.link_check(ring, second, index), hashlib.sha256(b"first").digest())
+            self.assertFalse(LWW.verify(ring, b"second", second, linkIndex=index))
+            self.assertTrue(LWW.verify(ring, b"second", other, linkIndex=index))
+            # the same keys with another transcript are another ring
+            self.assertIsNone(LWW.link_check(LWWRing(publicKeys, "binary"), first, index))
+
+    def test_verify_WithLinkIndex_NegatedYTilde(self):
+        """
+        Test that signing again with -y~, which verifies whenever the challenge of the signer is even, is linked.
+        """
+        completeKeys = [LWW.keygen() for _ in range(3)]
+        publicKeys = [(y, q, g) for y, x, q, g in completeKeys]
+        ring = LWWRing(publicKeys)
+        x, q = completeKeys[0][1], completeKeys[0][2]
+        first = LWW.ringsign(x, ring, b"first")
+        # a ring which signs with the negated tag
+        negated = LWWRing(publicKeys)
+        negated.yTilde = lambda privateKey: q - ring.yTilde(privateKey)
+        for _ in range(64):
+            second = LWW.ringsign(x, negated, b"second")
+            if LWW.verify(ring, b"second", second):
+                break
+        self.assertTrue(LWW.verify(ring, b"second", second))
+        self.assertEqual(second[2], q - first[2])
+        with tempfile.TemporaryDirectory() as directory, LinkIndex(directory) as index:
+            self.assertTrue(LWW.verify(ring, b"first", first, linkIndex=index))
+            self.assertEqual(LWW.link_check(ring, second, index), hashlib.sha256(b"first").digest())
+            self.assertFalse(LWW.verify(ring, b"second", second, linkIndex=index))
+
+    def test_verify_batch(self):
+        """
+        Test that verify_batch returns the results in the order of the signatures, with and without processes.
+        """
+        completeKeys = [LWW.keygen(group="modp1024-q256") for _ in range(5)]
+        ring = LWWRing([(y, q, g, order) for y, x, q, g, order in completeKeys])
+        messages = [str(i).encode() for i in range(9)]
+        signatures = [LWW.ringsign(completeKeys[i % 5][1], ring, message) for i, message in enumerate(messages)]
+        messages[3] = b"forged"
+        c1, s, y_Tilde = signatures[7]
+        signatures[7] = [c1, s[1:] + s[:1], y_Tilde]
+        expected = [i not in (3, 7) for i in range(9)]
+        try:
+            self.assertEqual(LWW.verify_batch(ring, messages, signatures, workers=1), expected)
+            self.assertEqual(LWW.verify_batch(ring, messages, signatures, workers=2), expected)
+        finally:
+            ring.shutdown()
+        self.assertEqual(LWW.verify_batch(ring, [], []), [])
+        with self.assertRaises(ValueError):
+            LWW.verify_batch(ring, messages[:2], signatures[:1])
+        with self.assertRaises(ValueError):
+            LWW.verify_batch(ring, messages[:1], [[c1, s[1:], y_Tilde]])
+
+    def test_verify_batch_yTildeOutOfRange(self):
+        """
+        Test that a y~ outside of the group only fails its own signature, also with the binary transcript.
+        """
+        completeKeys = [LWW.keygen() for _ in range(3)]
+        ring = LWWRing([(y, q, g) for y, x, q, g in completeKeys], transcript="binary")
+        messages = [str(i).encode() for i in range(4)]
+        signatures = [LWW.ringsign(completeKeys[i % 3][1], ring, message) for i, message in enumerate(messages)]
+        c1, s, y_Tilde = signatures[1]
+        signatures[1] = [c1, s, y_Tilde + ring.q]
+        c1, s, y_Tilde = signatures[2]
+        signatures[2] = [c1, s, -y_Tilde]
+        try:
+            for workers in [1, 2]:
+                self.assertEqual(LWW.verify_batch(ring, messages, signatures, workers=workers),
+                                 [True, False, False, True])
+        finally:
+            ring.shutdown()
+
+    def test_keygen_bulk_overwrites_with_private_permissions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ring.keys")
+            with open(path, "wb") as existing:
+                existing.write(b"readable by everyone")
+            os.chmod(path, 0o644)
+            store = LWW.keygen_bulk(path, 3, workers=1)
+            self.assertEqual(len(store), 3)
+            store.close()
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+            self.assertEqual(os.listdir(directory), ["ring.keys"])
+
+    def test_keygen_bulk(self):
+        """
+        Test that a key store holds valid keys of the group, also when they are made by processes.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ring.keys")
+            for workers in [1, 2]:
+                store = LWW.keygen_bulk(path, 50, workers=workers, chunk=16)
+                self.assertEqual(len(store), 50)
+                publicKeys = store.publicKeys()
+                for i in [0, 17, 49]:
+                    y, x, q, g = store.completeKey(i)
+                    self.assertEqual((q, g), (get_group(1024).p, get_group(1024).g))
+                    self.assertEqual(y, pow(g, x, q))
+                    self.assertEqual(publicKeys[i], (y, q, g))
+                self.assertEqual(len(set(publicKeys)), 50)
+                with self.assertRaises(IndexError):
+                    store.completeKey(50)
+                store.close()
+
+            # a record which was only partly written is ignored
+            with open(path, "ab") as keys:
+                keys.write(b"\x01" * 100)
+            store = LWWKeyStore(path)
+            self.assertEqual(len(store), 50)
+            store.close()
+            with open(path, "r+b") as keys:
+                keys.write(b"NOTAKEYS")
+            with self.assertRaises(ValueError):
+                LWWKeyStore(path)
+
     @staticmethod
     def generatorDummy(n, userIndex):
         """
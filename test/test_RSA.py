@@ -1,7 +1,9 @@
 """This file contains unittests for the RSAsig."""
 
+import os
+import tempfile
 import unittest
-from libsig.RSAsig import RSAsig
+from libsig.RSAsig import RSAsig, RSAPrivateKey, RSAKeyPool
 
 class TestRSAsig(unittest.TestCase):
     """We inherit from unittest.TestCase, so that nosetest can
@@ -33,5 +35,128 @@ class TestRSAsig(unittest.TestCase):
         sig_mm = RSAsig.sign(self.privkey, chr(msg1*msg2).encode())
         self.assertNotEqual(sig_mm, sig1*sig2)
 
+    def test_crt_matches_plain_signature(self):
+        """
+        Check that signing with the primes gives the same signature as with (d, n).
+        """
+        self.assertIsInstance(self.privkey, RSAPrivateKey)
+        d, n = self.privkey
+        for message in [b"", b"Star wars is awesome", bytes(range(256))]:
+            self.assertEqual(RSAsig.sign(self.privkey, message), RSAsig.sign((d, n), message))
+
+    def test_multi_prime_keys(self):
+        """
+        Check that keys with three and four primes have a full length modulus and sign correctly.
+        """
+        message = str.encode("Star wars is awesome")
+        for prime_count in (3, 4):
+            (pubkey, privkey, primes) = RSAsig.keygen(256, prime_count=prime_count)
+            self.assertEqual(len(set(primes)), prime_count)
+            self.assertEqual(pubkey[1].bit_length(), 256 * prime_count)
+            signature = RSAsig.sign(privkey, message)
+            self.assertEqual(signature, RSAsig.sign(tuple(privkey), message))
+            self.assertTrue(RSAsig.verify(pubkey, message, signature))
+
+    def test_verify_batch(self):
+        """
+        Check that batch verification finds exactly the incorrect signatures.
+        """
+        messages = [str(i).encode() for i in range(20)]
+        signatures = [RSAsig.sign(self.privkey, message) for message in messages]
+        self.assertEqual(RSAsig.verify_batch(self.pubkey, messages, signatures), [True] * 20)
+        for bad in ([0], [19], [3, 4, 17], list(range(20))):
+            tampered = list(signatures)
+            for i in bad:
+                tampered[i] += 1
+            expected = [i not in bad for i in range(20)]
+            self.assertEqual(RSAsig.verify_batch(self.pubkey, messages, tampered), expected)
+        self.assertEqual(RSAsig.verify_batch(self.pubkey, [], []), [])
+
+    def test_verify_batch_is_screening(self):
+        """
+        Check that a passing screen does not imply that verify accepts the signatures.
+        """
+        messages = [str(i).encode() for i in range(4)]
+        signatures = [RSAsig.sign(self.privkey, message) for message in messages]
+        n = self.pubkey[1]
+        signatures[1], signatures[2] = n - signatures[1], n - signatures[2]
+        self.assertEqual(RSAsig.verify_batch(self.pubkey, messages, signatures), [True] * 4)
+        self.assertFalse(RSAsig.verify(self.pubkey, messages[1], signatures[1]))
+
+    def test_parallel_keygen(self):
+        """
+        Check that keys whose primes were searched for concurrently work.
+        """
+        (pubkey, privkey, (p, q)) = RSAsig.keygen(512, workers=2)
+        self.assertNotEqual(p, q)
+        self.assertEqual(pubkey[1], p*q)
+        message = str.encode("Star wars is awesome")
+        self.assertTrue(RSAsig.verify(pubkey, message, RSAsig.sign(privkey, message)))
+
+class TestRSAKeyPool(unittest.TestCase):
+    """Tests for the pool of pre-generated keypairs."""
+
+    def setUp(self):
+        self.spool = tempfile.TemporaryDirectory()
+        self.message = str.encode("Star wars is awesome")
+
+    def tearDown(self):
+        self.spool.cleanup()
+
+    def assertValidKeypair(self, keypair):
+        (pubkey, privkey, primes) = keypair
+        self.assertTrue(RSAsig.verify(pubkey, self.message, RSAsig.sign(privkey, self.message)))
+
+    def test_get_and_metrics(self):
+        pool = RSAKeyPool(256, low=1, high=3, workers=1)
+        self.addCleanup(pool.stop)
+        self.assertTrue(pool.wait_filled(timeout=60))
+        self.assertValidKeypair(pool.get())
+        metrics = pool.metrics()
+        self.assertEqual(metrics["drawn"], 1)
+        self.assertEqual(metrics["misses"], 0)
+        self.assertGreaterEqual(metrics["generated"], 3)
+        self.assertGreater(metrics["refill_rate"], 0)
+
+    def test_empty_pool_generates_synchronously(self):
+        pool = RSAKeyPool(256, low=1, high=3, start=False)
+        self.assertValidKeypair(pool.get())
+        self.assertEqual(pool.metrics()["misses"], 1)
+
+    def test_spooled_keys_survive_restart(self):
+        pool = RSAKeyPool(256, low=1, high=3, workers=1, spool=self.spool.name)
+        self.assertTrue(pool.wait_filled(timeout=60))
+        pool.stop()
+        spooled = sorted(os.listdir(self.spool.name))
+        self.assertEqual(len(spooled), len(pool))
+
+        restarted = RSAKeyPool(256, low=1, high=3, spool=self.spool.name, start=False)
+        self.assertEqual(len(restarted), len(spooled))
+        self.assertValidKeypair(restarted.get())
+        self.assertEqual(len(os.listdir(self.spool.name)), len(spooled) - 1)
+
+    @unittest.skipUnless(hasattr(os, "register_at_fork"), "needs os.fork")
+    def test_forked_child_does_not_share_keys(self):
+        pool = RSAKeyPool(256, low=1, high=3, workers=1, spool=self.spool.name)
+        self.assertTrue(pool.wait_filled(timeout=60))
+        pool.stop()
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                (pubkey, _, _) = pool.get()
+                os.write(write, "{} {} {}".format(len(pool), pool.misses, pubkey[1]).encode())
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        depth, misses, child_modulus = map(int, os.read(read, 4096).split())
+        os.close(read)
+        os.close(write)
+        self.assertEqual((depth, misses), (0, 1))
+        self.assertEqual(len(pool), 3)
+        (pubkey, _, _) = pool.get()
+        self.assertNotEqual(pubkey[1], child_modulus)
+
+
 if __name__ == 'main':
     unittest.main()
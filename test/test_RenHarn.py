@@ -1,7 +1,12 @@
 """This file contains unittests for the ElGamal and RenHarn signature schemes."""
 
+import os
+import threading
 import unittest
-from libsig.RenHarn import ElGamal, RenHarn
+from hashlib import sha256
+from gmpy2 import gcd
+from libsig.RenHarn import ElGamal, RenHarn, RandomnessPool, SelfCheckPolicy, member_equations_hold, random_unit, _chain_hash
+from libsig.RenHarn import get_randomness_pool, _ring_executors
 
 
 class TestElGamal(unittest.TestCase):
@@ -23,6 +28,79 @@ class TestElGamal(unittest.TestCase):
         signature = ElGamal.sign(self.privkey, message)
         self.assertTrue(ElGamal.verify(self.pubkey, message, signature))
 
+    def test_standard_group_keys_share_parameters(self):
+        """
+        Keys of a size with a standard group are generated in that group.
+        """
+        (e1, d1) = ElGamal.keygen(1024)
+        (e2, d2) = ElGamal.keygen(1024)
+        self.assertEqual(e1[1:], e2[1:])
+        message = str.encode("Star wars is awesome")
+        self.assertTrue(ElGamal.verify(e1, message, ElGamal.sign(d1, message)))
+
+    def test_sign_with_randomness_pool(self):
+        message = str.encode("Star wars is awesome")
+        signatures = [ElGamal.sign(self.privkey, message, randomness_pool=True) for _ in range(5)]
+        for signature in signatures:
+            self.assertTrue(ElGamal.verify(self.pubkey, message, signature))
+        self.assertEqual(len(set(signatures)), 5)
+
+    @unittest.skipUnless(hasattr(os, "register_at_fork"), "needs os.fork")
+    def test_randomness_pool_not_shared_with_forked_child(self):
+        """
+        A nonce used by both processes would reveal the private key from two signatures.
+        """
+        (_, g, p) = self.pubkey
+        pool = get_randomness_pool(g, p, "sign", low=1, high=4)
+        self.assertTrue(pool.wait_filled(timeout=30))
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                alpha, _ = ElGamal.sign(self.privkey, b"child", randomness_pool=True)
+                os.write(write, str(alpha).encode())
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        child = int(os.read(read, 4096))
+        os.close(read)
+        os.close(write)
+        alpha, _ = ElGamal.sign(self.privkey, b"parent", randomness_pool=True)
+        self.assertNotEqual(alpha, child)
+
+    def test_verify_batch(self):
+        messages = [str.encode("Star wars is awesome {}".format(i)) for i in range(9)]
+        signatures = [ElGamal.sign(self.privkey, message) for message in messages]
+        for i in (2, 7):
+            # an error of beta by 2 keeps the quadratic character, it is only found by the random exponents
+            signatures[i] = (signatures[i][0], signatures[i][1] + 2)
+        signatures[4] = (0, signatures[4][1])
+        expected = [i not in (2, 4, 7) for i in range(9)]
+        self.assertEqual(ElGamal.verify_batch(self.pubkey, messages, signatures), expected)
+        self.assertEqual(ElGamal.verify_batch(self.pubkey, [], []), [])
+        with self.assertRaises(ValueError):
+            ElGamal.verify_batch(self.pubkey, messages[1:], signatures)
+
+    def test_random_unit(self):
+        p = self.pubkey[2]
+        for _ in range(200):
+            l = random_unit(p, 2)
+            self.assertTrue(3 <= l < p - 1)
+            self.assertEqual(gcd(l, p - 1), 1)
+
+    def test_randomness_pool(self):
+        (_, g, p) = self.pubkey
+        pool = RandomnessPool(g, p, "member", low=1, high=4)
+        try:
+            self.assertTrue(pool.wait_filled(timeout=30))
+            (a, b, b_inverse, g_a) = pool.get()
+            self.assertEqual(g_a, pow(g, a, p))
+            self.assertEqual(b * b_inverse % (p - 1), 1)
+        finally:
+            pool.stop()
+        with self.assertRaises(ValueError):
+            RandomnessPool(g, p, "other", start=False)
+
 
 class TestRenHarn(unittest.TestCase):
     """We inherit from unittest.TestCase, so that nosetest can
@@ -89,6 +167,158 @@ class TestRenHarn(unittest.TestCase):
                 self.assertFalse(RenHarn.verify(pubkeys, m, sig))
                 sig[2][i] = (m, alpha, beta)
 
+    def test_verify_without_batch_check(self):
+        message = str.encode("Star wars is awesome")
+        sig = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message)
+        self.assertTrue(RenHarn.verify(self.pubkeys, message, sig, soundness=None))
+        self.assertFalse(RenHarn.verify(self.pubkeys, message + b"!", sig, soundness=None))
+
+    def test_batch_check_detects_sign_errors(self):
+        """
+        An equation which is only wrong by a factor of -1 passes random even exponents, it is caught by the Legendre symbols.
+        """
+        message = str.encode("Star wars is awesome")
+        (_, _, ms) = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message)
+        (_, g, p) = self.pubkeys[0]
+        equations = [(pubkey[0], m, alpha, beta) for pubkey, (m, alpha, beta) in zip(self.pubkeys, ms)]
+        self.assertTrue(member_equations_hold(g, p, equations))
+        e, m, alpha, beta = equations[5]
+        equations[5] = (e, m + p // 2, alpha, beta)
+        for _ in range(20):
+            self.assertFalse(member_equations_hold(g, p, equations))
+        equations[5] = (e, m + 2, alpha, beta)
+        self.assertFalse(member_equations_hold(g, p, equations))
+
+    def test_batch_check_keeps_alpha_as_exponent(self):
+        """
+        alpha + p is the same base, but not the same exponent of e_i, so both checks must reject it.
+        """
+        message = str.encode("Star wars is awesome")
+        (e, r, ms) = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message)
+        p = self.pubkeys[0][2]
+        m, alpha, beta = ms[3]
+        ms[3] = (m, alpha + p, beta)
+        self.assertFalse(RenHarn.verify(self.pubkeys, message, (e, r, ms), soundness=None))
+        for _ in range(10):
+            self.assertFalse(RenHarn.verify(self.pubkeys, message, (e, r, ms)))
+
+    def test_batch_check_needs_safe_prime(self):
+        """
+        For p = 1021, p - 1 has the factor 3, and an error of order 3 would pass a third of the random exponents.
+        """
+        p, g = 1021, 10
+        d, l, beta = 5, 7, 3
+        e, alpha = pow(g, d, p), pow(g, l, p)
+        m = (d * alpha + l * beta) % (p - 1)
+        self.assertTrue(member_equations_hold(g, p, [(e, m, alpha, beta)] * 2))
+        w = pow(5, (p - 1) // 3, p)
+        for _ in range(30):
+            self.assertFalse(member_equations_hold(g, p, [(e * w % p, m, alpha, beta)] * 2))
+
+    def test_verify_batch(self):
+        messages = [str.encode("Star wars is awesome {}".format(i)) for i in range(4)]
+        sigs = [RenHarn.ringsign(self.privkeys[0], self.pubkeys, message) for message in messages]
+        rings = [self.pubkeys] * 4
+        self.assertEqual(RenHarn.verify_batch(rings, messages, sigs), [True] * 4)
+        (i_0, v_i_0, ms) = sigs[2]
+        (m, alpha, beta) = ms[1]
+        ms = list(ms)
+        ms[1] = (m, alpha, beta + 1)
+        sigs[2] = (i_0, v_i_0, ms)
+        messages[0] = b"forged"
+        self.assertEqual(RenHarn.verify_batch(rings, messages, sigs), [False, True, False, True])
+        with self.assertRaises(ValueError):
+            RenHarn.verify_batch(rings, messages[1:], sigs)
+
+    def test_ring_sign_with_randomness_pool(self):
+        message = str.encode("Star wars is awesome")
+        sig = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message, randomness_pool=True)
+        self.assertTrue(RenHarn.verify(self.pubkeys, message, sig))
+
+    def test_self_check_policy(self):
+        message = str.encode("Star wars is awesome")
+        (d, g, p) = self.privkeys[0]
+        faulty = (d + 1, g, p)
+        always, never = SelfCheckPolicy(1), SelfCheckPolicy(0)
+        with self.assertRaises(RuntimeError):
+            RenHarn.ringsign(faulty, self.pubkeys, message, self_check=always)
+        sig = RenHarn.ringsign(faulty, self.pubkeys, message, self_check=never)
+        self.assertFalse(RenHarn.verify(self.pubkeys, message, sig))
+        sig = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message, self_check=always)
+        self.assertTrue(RenHarn.verify(self.pubkeys, message, sig))
+        self.assertEqual((always.signatures, always.checks, always.failures), (2, 2, 1))
+        self.assertEqual((never.signatures, never.checks, never.failures), (1, 0, 0))
+        with self.assertRaises(ValueError):
+            SelfCheckPolicy(1.5)
+
+    def test_str_transcript_matches_earlier_versions(self):
+        message = str.encode("Star wars is awesome")
+        h = _chain_hash(message, self.pubkeys[0][2])
+        for v in [1, 12345, self.pubkeys[0][2] - 1]:
+            self.assertEqual(h(v), int(sha256(str.encode(str(message) + str(v))).hexdigest(), 16))
+
+    def test_binary_transcript(self):
+        message = str.encode("Star wars is awesome") * 100
+        sig = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message, transcript="binary")
+        self.assertTrue(RenHarn.verify(self.pubkeys, message, sig, transcript="binary"))
+        self.assertFalse(RenHarn.verify(self.pubkeys, message, sig))
+        self.assertFalse(RenHarn.verify(self.pubkeys, message + b"!", sig, transcript="binary"))
+        self.assertEqual(RenHarn.verify_batch([self.pubkeys], [message], [sig], transcript="binary"), [True])
+        with self.assertRaises(ValueError):
+            RenHarn.ringsign(self.privkeys[0], self.pubkeys, message, transcript="json")
+        with self.assertRaises(TypeError):
+            RenHarn.ringsign(self.privkeys[0], self.pubkeys, 3, transcript="binary")
+
+    def test_parallel_sign_and_verify(self):
+        message = str.encode("Star wars is awesome")
+        try:
+            sig = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message, workers=2)
+            self.assertTrue(RenHarn.verify(self.pubkeys, message, sig))
+            self.assertTrue(RenHarn.verify(self.pubkeys, message, sig, workers=2))
+            sig = RenHarn.ringsign(self.privkeys[0], self.pubkeys, message)
+            self.assertTrue(RenHarn.verify(self.pubkeys, message, sig, workers=2))
+            (d, g, p) = self.privkeys[0]
+            sig = RenHarn.ringsign((d + 1, g, p), self.pubkeys, message, self_check=SelfCheckPolicy(0), workers=2)
+            self.assertFalse(RenHarn.verify(self.pubkeys, message, sig, workers=2))
+            with self.assertRaises(RuntimeError):
+                RenHarn.ringsign((d + 1, g, p), self.pubkeys, message, self_check=SelfCheckPolicy(1), workers=2)
+        finally:
+            RenHarn.shutdown()
+
+    def test_parallel_rings_share_pools_safely(self):
+        """
+        Alternating rings keep their process pools, and evicting a pool doesn't break a thread still using it.
+        """
+        message = str.encode("Star wars is awesome")
+        rings = [self.pubkeys[:size] for size in range(10, 16)]
+        try:
+            for _ in range(2):
+                for ring in rings[:2]:
+                    sig = RenHarn.ringsign(self.privkeys[0], ring, message, workers=2)
+                    self.assertTrue(RenHarn.verify(ring, message, sig, workers=2))
+            self.assertEqual(len(_ring_executors), 2)
+            results, errors = [], []
+
+            def sign_and_verify(ring):
+                try:
+                    for _ in range(2):
+                        sig = RenHarn.ringsign(self.privkeys[0], ring, message, workers=2)
+                        results.append(RenHarn.verify(ring, message, sig, workers=2))
+                except Exception as error:
+                    errors.append(error)
+
+            threads = [threading.Thread(target=sign_and_verify, args=(ring,)) for ring in rings]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(results, [True] * 2 * len(rings))
+            self.assertLessEqual(len(_ring_executors), 4)
+        finally:
+            RenHarn.shutdown()
+        self.assertEqual(len(_ring_executors), 0)
+
 
 if __name__ == 'main':
     unittest.main()
@@ -0,0 +1,49 @@
+"""This file contains unittests for the shared modular arithmetic."""
+
+import unittest
+from libsig.arithmetic import FixedBase, multi_pow, power_function
+from libsig.primes import get_group
+from libsig.secrets import randbelow
+
+
+class TestArithmetic(unittest.TestCase):
+    """Tests for the multi-exponentiation and the fixed-base tables."""
+
+    def setUp(self):
+        self.group = get_group(1024)
+
+    def test_multi_pow_matches_pow(self):
+        p = self.group.p
+        bases = [randbelow(p) for _ in range(5)]
+        exponents = [randbelow(p) for _ in range(5)]
+        expected = 1
+        for base, exponent in zip(bases, exponents):
+            expected = expected * pow(base, exponent, p) % p
+        for window in (1, 4, 5):
+            self.assertEqual(multi_pow(bases, exponents, p, window), expected)
+
+    def test_multi_pow_edge_cases(self):
+        self.assertEqual(multi_pow([], [], 101), 1)
+        self.assertEqual(multi_pow([5, 7], [0, 0], 101), 1)
+        with self.assertRaises(ValueError):
+            multi_pow([5], [1, 2], 101)
+        with self.assertRaises(ValueError):
+            multi_pow([5], [-1], 101)
+
+    def test_fixed_base_matches_pow(self):
+        p, g = self.group.p, self.group.g
+        fixed = FixedBase(g, p, p.bit_length())
+        for exponent in [0, 1, p - 1] + [randbelow(p) for _ in range(20)]:
+            self.assertEqual(fixed.pow(exponent), pow(g, exponent, p))
+        # exponents outside the table fall back to pow()
+        self.assertEqual(fixed.pow(p ** 2), pow(g, p ** 2, p))
+
+    def test_power_function(self):
+        p, g = self.group.p, self.group.g
+        exponent = randbelow(p)
+        for uses in (1, 10, 1000):
+            self.assertEqual(power_function(g, p, p.bit_length(), uses)(exponent), pow(g, exponent, p))
+
+
+if __name__ == '__main__':
+    unittest.main()
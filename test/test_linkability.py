@@ -0,0 +1,57 @@
+"""This file contains unittests for the persistent index of linkability tags."""
+
+import os
+import tempfile
+import unittest
+from libsig.linkability import LinkIndex, tag_key
+
+
+class TestLinkIndex(unittest.TestCase):
+    """Tests for LinkIndex and its files."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_add_and_lookup(self):
+        with LinkIndex(self.path) as index:
+            self.assertIsNone(index.add(b"ring", 7, b"first"))
+            self.assertEqual(index.add(b"ring", 7, b"second"), b"first")
+            self.assertIsNone(index.add(b"other ring", 7))
+            self.assertEqual(index.lookup(b"ring", 7), b"first")
+            self.assertEqual(index.lookup(b"other ring", 7), b"")
+            self.assertIsNone(index.lookup(b"ring", 8))
+            self.assertIn((b"ring", 7), index)
+            self.assertNotIn((b"ring", 8), index)
+            self.assertEqual(len(index), 2)
+
+    def test_bulk_grows_and_persists(self):
+        tags = [(b"ring", tag, tag.to_bytes(4, "big")) for tag in range(1000)]
+        with LinkIndex(self.path, capacity=16) as index:
+            self.assertEqual(index.add_many(tags[:600]), [None] * 600)
+            self.assertEqual(index.add_many(tags[500:] + tags[999:]), [tags[i][2] for i in range(500, 600)] + [None] * 400 + [tags[999][2]])
+        with LinkIndex(self.path) as index:
+            self.assertEqual(len(index), 1000)
+            self.assertEqual(index.lookup_many([(fingerprint, tag) for fingerprint, tag, _ in tags]), [reference for _, _, reference in tags])
+            self.assertEqual(index.lookup_many([(b"ring", tag) for tag in range(1000, 2000)]), [None] * 1000)
+
+    def test_replays_log_after_crash(self):
+        with LinkIndex(self.path) as index:
+            index.add(b"ring", 1, b"one")
+            index.add(b"ring", 2, b"two")
+        # a lost index, and a record which was written only partly
+        os.remove(os.path.join(self.path, "tags.idx"))
+        with open(os.path.join(self.path, "tags.log"), "ab") as log:
+            log.write(tag_key(b"ring", 3) + b"\x00\x00")
+        with LinkIndex(self.path) as index:
+            self.assertEqual(index.lookup_many([(b"ring", 1), (b"ring", 2), (b"ring", 3)]), [b"one", b"two", None])
+            self.assertIsNone(index.add(b"ring", 3, b"three"))
+        with LinkIndex(self.path) as index:
+            self.assertEqual(index.lookup(b"ring", 3), b"three")
+
+
+if __name__ == '__main__':
+    unittest.main()
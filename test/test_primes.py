@@ -0,0 +1,86 @@
+"""This file contains unittests for the prime generation."""
+
+import unittest
+from gmpy2 import is_strong_bpsw_prp
+from libsig.primes import PrimePool, get_group, group_names
+
+
+class TestPrimePool(unittest.TestCase):
+    """Tests for the background refilled PrimePool."""
+
+    def setUp(self):
+        self.pool = PrimePool(128, low=2, high=6)
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def test_fills_up_to_high_watermark(self):
+        self.assertTrue(self.pool.wait_filled(timeout=30))
+        self.assertEqual(len(self.pool), 6)
+
+    def test_get_returns_distinct_primes(self):
+        self.pool.wait_filled(timeout=30)
+        primes = [self.pool.get() for _ in range(10)]
+        self.assertEqual(len(set(primes)), 10)
+        for prime in primes:
+            self.assertTrue(is_strong_bpsw_prp(prime))
+            self.assertEqual(prime.bit_length(), 128)
+        self.assertEqual(self.pool.drawn, 10)
+
+    def test_refills_below_low_watermark(self):
+        self.pool.wait_filled(timeout=30)
+        for _ in range(5):
+            self.pool.get()
+        self.assertTrue(self.pool.wait_filled(timeout=30))
+
+    def test_empty_stopped_pool_generates_synchronously(self):
+        self.pool.stop()
+        while len(self.pool):
+            self.pool.get()
+        misses = self.pool.misses
+        self.assertTrue(is_strong_bpsw_prp(self.pool.get()))
+        self.assertEqual(self.pool.misses, misses + 1)
+
+    def test_process_pool_is_kept_while_running(self):
+        pool = PrimePool(128, low=2, high=6, workers=2)
+        try:
+            executor = pool._executor
+            self.assertTrue(pool.wait_filled(timeout=30))
+            primes = [pool.get() for _ in range(6)]
+            self.assertTrue(pool.wait_filled(timeout=30))
+            self.assertIs(pool._executor, executor)
+            self.assertEqual(len(set(primes)), 6)
+        finally:
+            pool.stop()
+        self.assertIsNone(pool._executor)
+
+    def test_invalid_watermarks(self):
+        with self.assertRaises(ValueError):
+            PrimePool(128, low=4, high=4, start=False)
+
+
+class TestStandardGroups(unittest.TestCase):
+    """Tests for the registry of standard groups."""
+
+    def test_group_parameters(self):
+        for name in group_names():
+            group = get_group(name)
+            self.assertTrue(is_strong_bpsw_prp(group.p), name)
+            self.assertTrue(is_strong_bpsw_prp(group.q), name)
+            self.assertEqual((group.p - 1) % group.q, 0, name)
+            self.assertNotEqual(group.g, 1, name)
+            self.assertEqual(pow(group.g, group.q, group.p), 1, name)
+
+    def test_lookup_by_size(self):
+        self.assertEqual(get_group(3072).name, "modp3072")
+        self.assertEqual(get_group(2048, order_bits=256).q.bit_length(), 256)
+
+    def test_unknown_group(self):
+        with self.assertRaises(ValueError):
+            get_group(1000)
+        with self.assertRaises(ValueError):
+            get_group("modp1000")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""This file contains unittests for the buffered random number generator."""
+
+import os
+import unittest
+from libsig import secrets
+
+
+class TestBufferedRandom(unittest.TestCase):
+    """Tests for BufferedRandom and the module level helpers built on it."""
+
+    def test_randrange_bounds(self):
+        values = [secrets.randrange(5, 9) for _ in range(1000)]
+        self.assertEqual(set(values), {5, 6, 7, 8})
+
+    def test_randrange_many_bounds(self):
+        values = secrets.randrange_many(-3, 2**130, 500)
+        self.assertEqual(len(values), 500)
+        self.assertTrue(all(-3 <= v < 2**130 for v in values))
+
+    def test_empty_range(self):
+        with self.assertRaises(ValueError):
+            secrets.randrange(4, 4)
+        with self.assertRaises(ValueError):
+            secrets.randbelow_many(0, 3)
+
+    def test_getrandbits_length(self):
+        rand = secrets.BufferedRandom(buffer_size=16)
+        self.assertTrue(all(rand.getrandbits(13) < 2**13 for _ in range(100)))
+        self.assertEqual(len(rand.randbytes(100)), 100)
+
+    @unittest.skipUnless(hasattr(os, "register_at_fork"), "needs os.fork")
+    def test_reseeded_after_fork(self):
+        rand = secrets.BufferedRandom()
+        rand.getrandbits(8)
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write, rand.randbytes(32))
+            os._exit(0)
+        os.waitpid(pid, 0)
+        child = os.read(read, 32)
+        os.close(read)
+        os.close(write)
+        self.assertNotEqual(child, rand.randbytes(32))
+
+
+if __name__ == '__main__':
+    unittest.main()